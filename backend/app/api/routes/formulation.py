@@ -4,20 +4,38 @@ Handles perfume formula generation, IFRA validation, and physiological analysis.
 """
 
 from fastapi import APIRouter, HTTPException, UploadFile, File
+from fastapi.responses import ORJSONResponse, Response
 from pydantic import BaseModel, Field
+from functools import lru_cache
 from typing import Optional
+import asyncio
+import logging
 import uuid
 
-from app.core.ai_service import ai_analyzer
+import orjson
+
+from app.core.ai_batcher import ai_batcher
 from app.core.aether_agent import create_agent, AetherAgent
 from app.chemistry.ifra_validator import ifra_validator
-from app.chemistry.molecular_calc import calculate_logp, get_full_properties
+from app.chemistry.molecular_calc import calculate_logp, get_full_properties_batch
+from app.chemistry.mol_batcher import mol_batcher
 from app.chemistry.ingredient_db import ingredient_db
+from app.core.keyword_matcher import KeywordMatcher
+from app.core.ttl_cache import TTLCache
 from app.neuro.eeg_simulator import eeg_simulator
 from app.neuro.ph_analyzer import ph_analyzer
 from app.config import settings
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
+
+logger = logging.getLogger(__name__)
+
+# Upper bound for pH strip uploads; the analyzer only needs a small center crop
+MAX_IMAGE_BYTES = 10 * 1024 * 1024
+_UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+# Identical /validate payloads (iterative UI editing) are served from memory
+_validation_cache = TTLCache(maxsize=1024, ttl=300)
 
 
 # ============== Request/Response Models ==============
@@ -158,24 +176,40 @@ async def generate_formula(request: FormulationRequest):
     # Try AI-powered generation first
     if settings.openai_api_key:
         try:
-            result = await ai_analyzer.full_analysis(
-                emotional_input=request.prompt or "A balanced, elegant fragrance",
-                valence=valence,
-                arousal=arousal,
-                ph=request.ph_value,
-                skin_type=request.skin_type.lower(),
-                temperature=request.temperature
+            # Coalesced with concurrent identical requests; bounded so a hung
+            # upstream falls back to local generation
+            result = await asyncio.wait_for(
+                ai_batcher.submit({
+                    "emotional_input": request.prompt or "A balanced, elegant fragrance",
+                    "valence": valence,
+                    "arousal": arousal,
+                    "ph": request.ph_value,
+                    "skin_type": request.skin_type.lower(),
+                    "temperature": request.temperature
+                }),
+                timeout=settings.ai_timeout_seconds
             )
 
             formula_data = result.get("formula", {})
             recommendation = result.get("recommendation", {})
 
+            # Resolve each distinct name once, then fan the distinct SMILES
+            # out through the shared batcher (the model often repeats ingredients)
+            ai_ingredients = formula_data.get("ingredients", [])
+            names = dict.fromkeys(ing.get("name", "Unknown") for ing in ai_ingredients)
+            smiles_by_name = {name: _find_smiles_for_ingredient(name) for name in names}
+            unique_smiles = list(dict.fromkeys(smiles for smiles in smiles_by_name.values() if smiles))
+            props_by_smiles = dict(zip(
+                unique_smiles,
+                await asyncio.gather(*[mol_batcher.submit(smiles) for smiles in unique_smiles])
+            ))
+
             # Build ingredients with RDKit calculations
             ingredients = []
-            for ing in formula_data.get("ingredients", []):
+            for ing in ai_ingredients:
                 name = ing.get("name", "Unknown")
-                smiles = _find_smiles_for_ingredient(name)
-                mol_props = get_full_properties(smiles) if smiles else None
+                smiles = smiles_by_name[name]
+                mol_props = props_by_smiles.get(smiles) if smiles else None
 
                 ingredients.append(Ingredient(
                     name=name,
@@ -190,13 +224,12 @@ async def generate_formula(request: FormulationRequest):
                 ))
 
             # IFRA validation
-            ifra_report = ifra_validator.validate_formula([
+            ifra_report = await asyncio.to_thread(ifra_validator.validate_formula, [
                 {"name": i.name, "concentration": i.concentration}
                 for i in ingredients
             ])
 
-            # Calculate note pyramid
-            note_pyramid = _calculate_note_pyramid(ingredients)
+            note_pyramid, longevity, projection = _compute_formula_metrics(ingredients)
 
             return FormulaResponse(
                 formula_id=str(uuid.uuid4()),
@@ -204,8 +237,8 @@ async def generate_formula(request: FormulationRequest):
                 description=formula_data.get("description", recommendation.get("mood_interpretation", "")),
                 ingredients=ingredients,
                 note_pyramid=note_pyramid,
-                longevity_score=_estimate_longevity(ingredients),
-                projection_score=_estimate_projection(ingredients),
+                longevity_score=longevity,
+                projection_score=projection,
                 sustainability_score=formula_data.get("sustainability_score", 0.8) * 10,
                 ifra_compliant=ifra_report.is_compliant,
                 ifra_report={
@@ -217,11 +250,16 @@ async def generate_formula(request: FormulationRequest):
                 emotional_profile=emotional_profile
             )
 
-        except Exception:
-            pass  # Fall through to local generation
+        except asyncio.TimeoutError:
+            logger.warning(
+                "AI generation exceeded %.1fs; falling back to local formula",
+                settings.ai_timeout_seconds
+            )
+        except Exception as e:
+            logger.warning("AI generation failed (%s: %s); falling back to local formula", type(e).__name__, e)
 
-    # Local generation using AetherAgent
-    return _generate_local_formula(request, valence, arousal, emotional_profile)
+    # Local generation using AetherAgent (CPU-bound, keep it off the event loop)
+    return await asyncio.to_thread(_generate_local_formula, request, valence, arousal, emotional_profile)
 
 
 def _generate_local_formula(
@@ -230,7 +268,11 @@ def _generate_local_formula(
     arousal: float,
     emotional_profile: Optional[dict]
 ) -> FormulaResponse:
-    """Generate formula using local AetherAgent and Physio-RAG."""
+    """
+    Generate formula using local AetherAgent and Physio-RAG.
+
+    Synchronous by design - callers on the event loop run it via asyncio.to_thread.
+    """
     agent = create_agent(
         ph=request.ph_value,
         skin_type=request.skin_type.capitalize(),
@@ -245,11 +287,11 @@ def _generate_local_formula(
         arousal=arousal
     )
 
-    # Convert to response format with RDKit enrichment
+    # Convert to response format with RDKit enrichment (parallel across ingredients)
+    props_list = get_full_properties_batch([fi.ingredient.smiles for fi in formula.ingredients])
     ingredients = []
-    for fi in formula.ingredients:
+    for fi, mol_props in zip(formula.ingredients, props_list):
         ing = fi.ingredient
-        mol_props = get_full_properties(ing.smiles)
 
         ingredients.append(Ingredient(
             name=ing.name,
@@ -269,6 +311,8 @@ def _generate_local_formula(
         for i in ingredients
     ])
 
+    _, longevity, projection = _compute_formula_metrics(ingredients)
+
     # Generate name based on emotional quadrant
     formula_name = _generate_formula_name(valence, arousal, request.prompt)
 
@@ -278,8 +322,8 @@ def _generate_local_formula(
         description=formula.description or "A personalized fragrance crafted for your unique chemistry.",
         ingredients=ingredients,
         note_pyramid=formula.note_pyramid,
-        longevity_score=_estimate_longevity(ingredients),
-        projection_score=_estimate_projection(ingredients),
+        longevity_score=longevity,
+        projection_score=projection,
         sustainability_score=formula.sustainability_score,
         ifra_compliant=ifra_report.is_compliant,
         ifra_report={
@@ -299,12 +343,22 @@ async def validate_formula(request: ValidationRequest):
 
     Uses the full IFRA 51st Amendment database for compliance checking.
     """
+    # Names and concentrations are echoed back in order, so key on them exactly
+    cache_key = (
+        request.product_category,
+        tuple((ing.name, ing.concentration) for ing in request.ingredients)
+    )
+    cached = _validation_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
     ingredients_data = [
         {"name": ing.name, "concentration": ing.concentration}
         for ing in request.ingredients
     ]
 
-    report = ifra_validator.validate_formula(
+    report = await asyncio.to_thread(
+        ifra_validator.validate_formula,
         ingredients_data,
         product_category=request.product_category
     )
@@ -323,7 +377,7 @@ async def validate_formula(request: ValidationRequest):
 
     warnings = [v["recommendation"] for v in violations if v["severity"] == "warning"]
 
-    return ValidationResponse(
+    response = ValidationResponse(
         compliant=report.is_compliant,
         violations=violations,
         warnings=warnings,
@@ -332,6 +386,8 @@ async def validate_formula(request: ValidationRequest):
         max_allergen_limit=1.0,
         summary=report.summary
     )
+    _validation_cache.set(cache_key, response)
+    return response
 
 
 @router.post("/eeg-simulate", response_model=EEGSimulationResponse)
@@ -363,13 +419,18 @@ async def analyze_ph_image(file: UploadFile = File(...)):
     """
     Analyze pH test strip image to extract pH value.
 
-    Accepts JPEG or PNG images of pH test strips.
+    Accepts JPEG or PNG images of pH test strips, up to 10 MB.
     """
     if not file.content_type or not file.content_type.startswith("image/"):
         raise HTTPException(status_code=400, detail="File must be an image")
 
-    contents = await file.read()
-    result = ph_analyzer.analyze_image(contents)
+    contents = bytearray()
+    while chunk := await file.read(_UPLOAD_CHUNK_BYTES):
+        contents.extend(chunk)
+        if len(contents) > MAX_IMAGE_BYTES:
+            raise HTTPException(status_code=413, detail="Image exceeds 10 MB limit")
+
+    result = await asyncio.to_thread(ph_analyzer.analyze_image, bytes(contents))
 
     return PHAnalysisResponse(
         ph_value=result.ph_value,
@@ -408,7 +469,7 @@ async def analyze_molecule(request: MolecularAnalysisRequest):
 
     Returns LogP, molecular weight, volatility classification, and more.
     """
-    props = get_full_properties(request.smiles)
+    props = await mol_batcher.submit(request.smiles)
 
     return MolecularAnalysisResponse(
         smiles=props.smiles,
@@ -432,18 +493,32 @@ async def list_ingredients(
 
     Filters available: note_type (top/middle/base), sustainable_only, family
     """
-    ingredients = ingredient_db.get_all()
+    return Response(
+        content=_ingredients_json(
+            note_type.lower() if note_type else None,
+            sustainable_only,
+            family.lower() if family else None
+        ),
+        media_type="application/json"
+    )
 
-    if note_type:
-        ingredients = [i for i in ingredients if i.note_type == note_type.lower()]
 
-    if sustainable_only:
-        ingredients = [i for i in ingredients if i.is_sustainable]
+# ============== Helper Functions ==============
 
-    if family:
-        ingredients = [i for i in ingredients if i.family.lower() == family.lower()]
+@lru_cache(maxsize=64)
+def _ingredients_json(
+    note_type: Optional[str],
+    sustainable_only: bool,
+    family: Optional[str]
+) -> bytes:
+    """Filter the (static) ingredient DB and serialize once per filter combination."""
+    ingredients = ingredient_db.filter(
+        note_type=note_type,
+        family=family,
+        sustainable_only=sustainable_only
+    )
 
-    return [
+    return orjson.dumps([
         {
             "id": i.id,
             "name": i.name,
@@ -457,103 +532,194 @@ async def list_ingredients(
             "descriptors": i.descriptors
         }
         for i in ingredients
-    ]
+    ])
 
 
-# ============== Helper Functions ==============
+def _build_name_index() -> tuple[dict[str, str], KeywordMatcher]:
+    """Index lowercased DB ingredient names to SMILES (first entry wins on duplicates)."""
+    name_to_smiles: dict[str, str] = {}
+    for ing in ingredient_db.get_all():
+        name_to_smiles.setdefault(ing.name.lower(), ing.smiles)
+    return name_to_smiles, KeywordMatcher(name_to_smiles)
+
 
+_NAME_TO_SMILES, _NAME_MATCHER = _build_name_index()
+
+
+@lru_cache(maxsize=1024)
 def _find_smiles_for_ingredient(name: str) -> Optional[str]:
-    """Find SMILES string for an ingredient by name."""
+    """Find SMILES string for an ingredient by name (memoized; the DB is static)."""
     name_lower = name.lower()
-    for ing in ingredient_db.get_all():
-        if ing.name.lower() in name_lower or name_lower in ing.name.lower():
-            return ing.smiles
-    return None
-
-
-def _calculate_note_pyramid(ingredients: list[Ingredient]) -> dict:
-    """Calculate note type proportions."""
-    top_total = sum(i.concentration for i in ingredients if i.note_type == "top")
-    mid_total = sum(i.concentration for i in ingredients if i.note_type in ["middle", "heart"])
-    base_total = sum(i.concentration for i in ingredients if i.note_type == "base")
-    total = top_total + mid_total + base_total or 1
-
-    return {
-        "top": round(100 * top_total / total, 1),
-        "middle": round(100 * mid_total / total, 1),
-        "base": round(100 * base_total / total, 1)
-    }
+    exact = _NAME_TO_SMILES.get(name_lower)
+    if exact is not None:
+        return exact
 
+    # Fall back to containment in either direction, in DB order
+    matches = _NAME_MATCHER.matches(name_lower)
+    return _NAME_TO_SMILES[matches[0]] if matches else None
 
-def _estimate_longevity(ingredients: list[Ingredient]) -> float:
-    """Estimate fragrance longevity based on ingredient properties."""
-    if not ingredients:
-        return 5.0
 
-    # Higher LogP = better longevity
-    avg_logp = sum(i.logp * i.concentration for i in ingredients) / sum(i.concentration for i in ingredients)
-    base_score = 5.0 + (avg_logp - 2.5) * 1.5
+# Note type codes for the vectorized metrics path
+_NOTE_CODES = {"top": 0, "middle": 1, "heart": 1, "base": 2}
 
-    # More base notes = better longevity
-    base_ratio = sum(i.concentration for i in ingredients if i.note_type == "base") / sum(i.concentration for i in ingredients)
-    base_bonus = base_ratio * 3.0
+# Below this many ingredients the plain loop beats array conversion
+_VECTORIZE_MIN_INGREDIENTS = 64
 
-    return min(10.0, max(1.0, base_score + base_bonus))
 
+def _ingredients_to_arrays(ingredients: list[Ingredient]):
+    """
+    Convert ingredients to (concentration, logp, note_code) NumPy arrays.
 
-def _estimate_projection(ingredients: list[Ingredient]) -> float:
-    """Estimate fragrance projection (sillage) based on ingredient properties."""
-    if not ingredients:
-        return 5.0
+    note_code is 0/1/2 for top/middle/base and -1 for unknown note types.
+    """
+    import numpy as np
 
-    # More top notes = better projection initially
-    top_ratio = sum(i.concentration for i in ingredients if i.note_type == "top") / sum(i.concentration for i in ingredients)
-    top_bonus = top_ratio * 4.0
+    conc = np.fromiter((i.concentration for i in ingredients), dtype=np.float64, count=len(ingredients))
+    logp = np.fromiter((i.logp for i in ingredients), dtype=np.float64, count=len(ingredients))
+    note_code = np.fromiter(
+        (_NOTE_CODES.get(i.note_type, -1) for i in ingredients), dtype=np.int8, count=len(ingredients)
+    )
+    return conc, logp, note_code
+
+
+def _metrics_from_totals(
+    top_total: float,
+    mid_total: float,
+    base_total: float,
+    total_conc: float,
+    logp_weighted: float,
+    has_ingredients: bool
+) -> tuple[dict, float, float]:
+    """Derive pyramid, longevity and projection from concentration totals."""
+    # Note type proportions
+    pyramid_total = top_total + mid_total + base_total or 1
+    note_pyramid = {
+        "top": round(100 * top_total / pyramid_total, 1),
+        "middle": round(100 * mid_total / pyramid_total, 1),
+        "base": round(100 * base_total / pyramid_total, 1)
+    }
 
-    # Higher concentration = better projection
-    total_conc = sum(i.concentration for i in ingredients)
+    if not has_ingredients or total_conc == 0:
+        return note_pyramid, 5.0, 5.0
+
+    # Longevity: higher LogP and more base notes last longer
+    avg_logp = logp_weighted / total_conc
+    base_score = 5.0 + (avg_logp - 2.5) * 1.5
+    base_bonus = (base_total / total_conc) * 3.0
+    longevity = min(10.0, max(1.0, base_score + base_bonus))
+
+    # Projection (sillage): more top notes and higher concentration project further
+    top_bonus = (top_total / total_conc) * 4.0
     conc_factor = min(2.0, total_conc / 20.0)
+    projection = min(10.0, max(1.0, 4.0 + top_bonus + conc_factor))
 
-    return min(10.0, max(1.0, 4.0 + top_bonus + conc_factor))
+    return note_pyramid, longevity, projection
 
 
-def _extract_preferences(prompt: str) -> list[str]:
-    """Extract scent preferences from natural language prompt."""
-    preferences = []
-    keywords = {
-        "fresh": ["fresh", "clean", "crisp"],
-        "floral": ["flower", "floral", "rose", "jasmine", "lily"],
-        "woody": ["wood", "woody", "cedar", "sandalwood", "forest"],
-        "citrus": ["citrus", "lemon", "orange", "bergamot", "lime"],
-        "sweet": ["sweet", "vanilla", "caramel", "honey"],
-        "spicy": ["spicy", "pepper", "cinnamon", "warm"],
-        "earthy": ["earth", "moss", "rain", "petrichor"]
-    }
+def _compute_formula_metrics_vectorized(ingredients: list[Ingredient]) -> tuple[dict, float, float]:
+    """NumPy variant of _compute_formula_metrics for large ingredient lists."""
+    conc, logp, note_code = _ingredients_to_arrays(ingredients)
+    return _metrics_from_totals(
+        top_total=float(conc[note_code == 0].sum()),
+        mid_total=float(conc[note_code == 1].sum()),
+        base_total=float(conc[note_code == 2].sum()),
+        total_conc=float(conc.sum()),
+        logp_weighted=float(logp @ conc),
+        has_ingredients=len(ingredients) > 0
+    )
 
-    prompt_lower = prompt.lower()
-    for category, words in keywords.items():
-        if any(word in prompt_lower for word in words):
-            preferences.append(category)
 
-    return preferences
+def _compute_formula_metrics(ingredients: list[Ingredient]) -> tuple[dict, float, float]:
+    """
+    Compute note pyramid, longevity and projection in a single pass.
+
+    Large ingredient lists (e.g. candidate blends in optimization loops)
+    take the vectorized path.
+
+    Returns:
+        (note_pyramid, longevity_score, projection_score)
+    """
+    if len(ingredients) >= _VECTORIZE_MIN_INGREDIENTS:
+        return _compute_formula_metrics_vectorized(ingredients)
+
+    top_total = mid_total = base_total = 0.0
+    total_conc = 0.0
+    logp_weighted = 0.0
+
+    for ing in ingredients:
+        conc = ing.concentration
+        total_conc += conc
+        logp_weighted += ing.logp * conc
+        if ing.note_type == "top":
+            top_total += conc
+        elif ing.note_type in ("middle", "heart"):
+            mid_total += conc
+        elif ing.note_type == "base":
+            base_total += conc
+
+    return _metrics_from_totals(
+        top_total, mid_total, base_total, total_conc, logp_weighted,
+        has_ingredients=bool(ingredients)
+    )
+
+
+_PREFERENCE_KEYWORDS = {
+    "fresh": ["fresh", "clean", "crisp"],
+    "floral": ["flower", "floral", "rose", "jasmine", "lily"],
+    "woody": ["wood", "woody", "cedar", "sandalwood", "forest"],
+    "citrus": ["citrus", "lemon", "orange", "bergamot", "lime"],
+    "sweet": ["sweet", "vanilla", "caramel", "honey"],
+    "spicy": ["spicy", "pepper", "cinnamon", "warm"],
+    "earthy": ["earth", "moss", "rain", "petrichor"]
+}
+
+# Checked in priority order - the first rule with any keyword present wins
+_FORMULA_NAME_RULES = [
+    (("morning", "fresh"), "Dawn Whisper"),
+    (("night", "evening"), "Midnight Reverie"),
+    (("rain", "petrichor"), "After the Rain"),
+    (("garden", "flower"), "Secret Garden"),
+    (("ocean", "sea"), "Ocean Drift"),
+    (("forest", "wood"), "Forest Path"),
+]
+
+
+def _build_keyword_index(groups: list[tuple[str, list[str]]]) -> tuple[KeywordMatcher, dict[str, set[int]]]:
+    """Compile keyword groups into one matcher plus a keyword -> group index map."""
+    groups_by_word: dict[str, set[int]] = {}
+    for idx, (_, words) in enumerate(groups):
+        for word in words:
+            groups_by_word.setdefault(word, set()).add(idx)
+    return KeywordMatcher(groups_by_word), groups_by_word
+
+
+_PREFERENCE_CATEGORIES = list(_PREFERENCE_KEYWORDS)
+_PREFERENCE_MATCHER, _PREFERENCE_GROUPS = _build_keyword_index(list(_PREFERENCE_KEYWORDS.items()))
+_FORMULA_NAME_MATCHER, _FORMULA_NAME_GROUPS = _build_keyword_index(
+    [(name, list(words)) for words, name in _FORMULA_NAME_RULES]
+)
+
+
+def _matched_groups(matcher: KeywordMatcher, groups_by_word: dict[str, set[int]], text: str) -> set[int]:
+    """Indices of keyword groups with at least one keyword in text."""
+    matched = set()
+    for word in matcher.contained_in(text):
+        matched.update(groups_by_word[word])
+    return matched
+
+
+def _extract_preferences(prompt: str) -> list[str]:
+    """Extract scent preferences from natural language prompt."""
+    matched = _matched_groups(_PREFERENCE_MATCHER, _PREFERENCE_GROUPS, prompt.lower())
+    return [category for idx, category in enumerate(_PREFERENCE_CATEGORIES) if idx in matched]
 
 
 def _generate_formula_name(valence: float, arousal: float, prompt: Optional[str]) -> str:
     """Generate poetic formula name based on emotional profile."""
     if prompt:
-        prompt_lower = prompt.lower()
-        if "morning" in prompt_lower or "fresh" in prompt_lower:
-            return "Dawn Whisper"
-        elif "night" in prompt_lower or "evening" in prompt_lower:
-            return "Midnight Reverie"
-        elif "rain" in prompt_lower or "petrichor" in prompt_lower:
-            return "After the Rain"
-        elif "garden" in prompt_lower or "flower" in prompt_lower:
-            return "Secret Garden"
-        elif "ocean" in prompt_lower or "sea" in prompt_lower:
-            return "Ocean Drift"
-        elif "forest" in prompt_lower or "wood" in prompt_lower:
-            return "Forest Path"
+        matched = _matched_groups(_FORMULA_NAME_MATCHER, _FORMULA_NAME_GROUPS, prompt.lower())
+        if matched:
+            return _FORMULA_NAME_RULES[min(matched)][1]
 
     # Fallback to V-A quadrant names
     if valence >= 0:
@@ -3,11 +3,13 @@ IFRA Compliance Validator.
 Validates fragrance formulas against IFRA 51st Amendment standards.
 """
 
-import json
 from dataclasses import dataclass
 from typing import Optional
 
+import orjson
+
 from app.config import settings
+from app.core.keyword_matcher import KeywordMatcher
 
 
 @dataclass
@@ -47,24 +49,33 @@ class IFRAValidator:
 
     def __init__(self):
         self._standards: dict = {}
-        self._loaded = False
+        self._restricted_map: dict[str, dict] = {}
+        self._allergen_map: dict[str, dict] = {}
+        self._phototox_map: dict[str, dict] = {}
+        self._allergen_matcher = KeywordMatcher([])
+        self._phototox_matcher = KeywordMatcher([])
+        self._load_standards()
 
     def _load_standards(self):
-        """Load IFRA standards from JSON."""
-        if self._loaded:
-            return
-
+        """Load IFRA standards from JSON (once, at construction)."""
         standards_path = settings.data_dir / "ifra_standards.json"
 
         if not standards_path.exists():
             self._standards = {"restricted_substances": [], "allergens_declaration_required": [], "phototoxicity_limits": []}
-            self._loaded = True
-            return
+        else:
+            self._standards = orjson.loads(standards_path.read_bytes())
 
-        with open(standards_path, 'r', encoding='utf-8') as f:
-            self._standards = json.load(f)
+        self._build_indexes()
 
-        self._loaded = True
+    def _build_indexes(self):
+        """Build name lookup maps and substring matchers once per load."""
+        self._restricted_map = {s['name'].lower(): s for s in self._standards.get('restricted_substances', [])}
+        self._allergen_map = {a['name'].lower(): a for a in self._standards.get('allergens_declaration_required', [])}
+        self._phototox_map = {p['name'].lower(): p for p in self._standards.get('phototoxicity_limits', [])}
+
+        # Allergen/phototox entries match by containment in either direction
+        self._allergen_matcher = KeywordMatcher(self._allergen_map)
+        self._phototox_matcher = KeywordMatcher(self._phototox_map)
 
     def validate_formula(
         self,
@@ -81,16 +92,24 @@ class IFRAValidator:
         Returns:
             IFRAReport with compliance status and any violations
         """
-        self._load_standards()
-
         violations = []
         allergens_to_declare = []
         total_allergen_load = 0.0
-
-        # Build lookup maps
-        restricted_map = {s['name'].lower(): s for s in self._standards.get('restricted_substances', [])}
-        allergen_map = {a['name'].lower(): a for a in self._standards.get('allergens_declaration_required', [])}
-        phototox_map = {p['name'].lower(): p for p in self._standards.get('phototoxicity_limits', [])}
+        critical_count = 0
+        warning_count = 0
+
+        def _add_violation(violation: IFRAViolation):
+            """Record a violation and keep the severity counters current."""
+            nonlocal critical_count, warning_count
+            if violation.severity == "critical":
+                critical_count += 1
+            else:
+                warning_count += 1
+            violations.append(violation)
+
+        restricted_map = self._restricted_map
+        allergen_map = self._allergen_map
+        phototox_map = self._phototox_map
 
         # Check each ingredient
         for ing in ingredients:
@@ -106,7 +125,7 @@ class IFRAValidator:
 
                 if max_conc == 0:
                     # Banned substance
-                    violations.append(IFRAViolation(
+                    _add_violation(IFRAViolation(
                         ingredient_name=name,
                         cas_number=restricted.get('cas'),
                         violation_type="banned",
@@ -117,7 +136,7 @@ class IFRAValidator:
                     ))
                 elif concentration > max_conc:
                     # Over limit
-                    violations.append(IFRAViolation(
+                    _add_violation(IFRAViolation(
                         ingredient_name=name,
                         cas_number=restricted.get('cas'),
                         violation_type="over_limit",
@@ -128,52 +147,52 @@ class IFRAValidator:
                     ))
 
             # Check phototoxicity limits
-            for phototox_name, phototox in phototox_map.items():
-                if phototox_name in name_lower or name_lower in phototox_name:
-                    max_conc = phototox.get('max_concentration_cat1', 100)
-                    if concentration > max_conc:
-                        violations.append(IFRAViolation(
-                            ingredient_name=name,
-                            cas_number=None,
-                            violation_type="phototoxicity",
-                            current_concentration=concentration,
-                            max_allowed=max_conc,
-                            severity="critical",
-                            recommendation=f"Reduce {name} to max {max_conc}% for phototoxicity. {phototox.get('reason', '')}"
-                        ))
+            for phototox_name in self._phototox_matcher.matches(name_lower):
+                phototox = phototox_map[phototox_name]
+                max_conc = phototox.get('max_concentration_cat1', 100)
+                if concentration > max_conc:
+                    _add_violation(IFRAViolation(
+                        ingredient_name=name,
+                        cas_number=None,
+                        violation_type="phototoxicity",
+                        current_concentration=concentration,
+                        max_allowed=max_conc,
+                        severity="critical",
+                        recommendation=f"Reduce {name} to max {max_conc}% for phototoxicity. {phototox.get('reason', '')}"
+                    ))
 
             # Check allergen declaration
-            for allergen_name, allergen in allergen_map.items():
-                if allergen_name in name_lower or name_lower in allergen_name:
-                    threshold = allergen.get('threshold_cat1', 0.001)
-
-                    # Check if banned
-                    if threshold == 0:
-                        violations.append(IFRAViolation(
-                            ingredient_name=name,
-                            cas_number=allergen.get('cas'),
-                            violation_type="banned",
-                            current_concentration=concentration,
-                            max_allowed=0,
-                            severity="critical",
-                            recommendation=f"Remove {name} - banned allergen"
-                        ))
-                    elif concentration >= threshold:
-                        # Must be declared
-                        allergens_to_declare.append({
-                            "name": name,
-                            "cas": allergen.get('cas'),
-                            "concentration": concentration,
-                            "threshold": threshold
-                        })
-                        total_allergen_load += concentration
+            for allergen_name in self._allergen_matcher.matches(name_lower):
+                allergen = allergen_map[allergen_name]
+                threshold = allergen.get('threshold_cat1', 0.001)
+
+                # Check if banned
+                if threshold == 0:
+                    _add_violation(IFRAViolation(
+                        ingredient_name=name,
+                        cas_number=allergen.get('cas'),
+                        violation_type="banned",
+                        current_concentration=concentration,
+                        max_allowed=0,
+                        severity="critical",
+                        recommendation=f"Remove {name} - banned allergen"
+                    ))
+                elif concentration >= threshold:
+                    # Must be declared
+                    allergens_to_declare.append({
+                        "name": name,
+                        "cas": allergen.get('cas'),
+                        "concentration": concentration,
+                        "threshold": threshold
+                    })
+                    total_allergen_load += concentration
 
         # Check total allergen load
         allergen_limits = self._standards.get('total_allergen_limits', {}).get('cat1_leave_on', {})
         max_total = allergen_limits.get('max_total_percentage', 1.0)
 
         if total_allergen_load > max_total:
-            violations.append(IFRAViolation(
+            _add_violation(IFRAViolation(
                 ingredient_name="Total Allergens",
                 cas_number=None,
                 violation_type="allergen_load",
@@ -184,16 +203,15 @@ class IFRAValidator:
             ))
 
         # Determine compliance
-        critical_violations = [v for v in violations if v.severity == "critical"]
-        is_compliant = len(critical_violations) == 0
+        is_compliant = critical_count == 0
 
         # Generate summary
         if is_compliant and not violations:
             summary = "Formula is fully IFRA compliant with no issues detected."
         elif is_compliant:
-            summary = f"Formula is compliant with {len(violations)} warning(s). {len(allergens_to_declare)} allergen(s) require declaration."
+            summary = f"Formula is compliant with {warning_count} warning(s). {len(allergens_to_declare)} allergen(s) require declaration."
         else:
-            summary = f"Formula has {len(critical_violations)} critical violation(s) that must be resolved for IFRA compliance."
+            summary = f"Formula has {critical_count} critical violation(s) that must be resolved for IFRA compliance."
 
         return IFRAReport(
             is_compliant=is_compliant,
@@ -215,33 +233,23 @@ class IFRAValidator:
         Returns:
             Max concentration percentage, or None if not restricted
         """
-        self._load_standards()
-
         name_lower = ingredient_name.lower()
 
         # Check restricted substances
-        for restricted in self._standards.get('restricted_substances', []):
-            if restricted['name'].lower() == name_lower:
-                return restricted.get('max_concentration_cat1', None)
+        restricted = self._restricted_map.get(name_lower)
+        if restricted is not None:
+            return restricted.get('max_concentration_cat1', None)
 
         # Check phototoxicity limits
-        for phototox in self._standards.get('phototoxicity_limits', []):
-            if phototox['name'].lower() in name_lower:
-                return phototox.get('max_concentration_cat1', None)
+        phototox_names = self._phototox_matcher.contained_in(name_lower)
+        if phototox_names:
+            return self._phototox_map[phototox_names[0]].get('max_concentration_cat1', None)
 
         return None  # Not restricted
 
     def is_allergen(self, ingredient_name: str) -> bool:
         """Check if an ingredient is a declared allergen."""
-        self._load_standards()
-
-        name_lower = ingredient_name.lower()
-
-        for allergen in self._standards.get('allergens_declaration_required', []):
-            if allergen['name'].lower() in name_lower or name_lower in allergen['name'].lower():
-                return True
-
-        return False
+        return bool(self._allergen_matcher.matches(ingredient_name.lower()))
 
 
 # Singleton instance
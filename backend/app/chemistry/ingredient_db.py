@@ -43,6 +43,9 @@ class IngredientDatabase:
 
     _instance = None
     _ingredients: dict[str, Ingredient] = {}
+    _by_note_type: dict[str, list[Ingredient]] = {}
+    _by_family: dict[str, list[Ingredient]] = {}  # keyed by lowercased family
+    _sustainable: list[Ingredient] = []
     _loaded = False
 
     def __new__(cls):
@@ -61,6 +64,7 @@ class IngredientDatabase:
         if not data_path.exists():
             # Create minimal fallback
             self._ingredients = {}
+            self._build_indexes()
             self._loaded = True
             return
 
@@ -87,8 +91,21 @@ class IngredientDatabase:
             )
             self._ingredients[ingredient.id] = ingredient
 
+        self._build_indexes()
         self._loaded = True
 
+    def _build_indexes(self):
+        """Precompute filter indexes; each keeps the DB insertion order."""
+        by_note_type: dict[str, list[Ingredient]] = {}
+        by_family: dict[str, list[Ingredient]] = {}
+        for ing in self._ingredients.values():
+            by_note_type.setdefault(ing.note_type, []).append(ing)
+            by_family.setdefault(ing.family.lower(), []).append(ing)
+
+        self._by_note_type = by_note_type
+        self._by_family = by_family
+        self._sustainable = [ing for ing in self._ingredients.values() if ing.is_sustainable]
+
     def get_all(self) -> list[Ingredient]:
         """Get all ingredients."""
         return list(self._ingredients.values())
@@ -99,11 +116,45 @@ class IngredientDatabase:
 
     def get_by_note_type(self, note_type: str) -> list[Ingredient]:
         """Get ingredients by note type (top, middle, base)."""
-        return [ing for ing in self._ingredients.values() if ing.note_type == note_type]
+        return list(self._by_note_type.get(note_type, []))
 
     def get_by_family(self, family: str) -> list[Ingredient]:
         """Get ingredients by fragrance family."""
-        return [ing for ing in self._ingredients.values() if ing.family == family]
+        return [ing for ing in self._by_family.get(family.lower(), []) if ing.family == family]
+
+    def filter(
+        self,
+        note_type: Optional[str] = None,
+        family: Optional[str] = None,
+        sustainable_only: bool = False
+    ) -> list[Ingredient]:
+        """
+        Get ingredients matching all given filters, in DB order.
+
+        Starts from the smallest precomputed index and checks the
+        remaining filters in a single pass.
+
+        Args:
+            note_type: Exact note type to match
+            family: Fragrance family (case-insensitive)
+            sustainable_only: Only sustainable ingredients
+        """
+        candidates = [list(self._ingredients.values())]
+        if note_type:
+            candidates.append(self._by_note_type.get(note_type, []))
+        if family:
+            candidates.append(self._by_family.get(family.lower(), []))
+        if sustainable_only:
+            candidates.append(self._sustainable)
+
+        base = min(candidates, key=len)
+        family_lower = family.lower() if family else None
+        return [
+            ing for ing in base
+            if (not note_type or ing.note_type == note_type)
+            and (not family_lower or ing.family.lower() == family_lower)
+            and (not sustainable_only or ing.is_sustainable)
+        ]
 
     def get_sustainable(self, min_score: int = 8) -> list[Ingredient]:
         """Get sustainable ingredients above a minimum score."""
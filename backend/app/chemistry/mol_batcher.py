@@ -0,0 +1,18 @@
+"""
+Async micro-batcher for molecular property calculations.
+Coalesces concurrent SMILES lookups into a single RDKit batch call.
+"""
+
+import asyncio
+
+from app.chemistry.molecular_calc import MolecularProperties, get_full_properties_batch
+from app.core.async_batcher import AsyncBatcher
+
+
+async def _compute_batch(smiles_list: list[str]) -> list[MolecularProperties]:
+    """Run the RDKit batch off the event loop."""
+    return await asyncio.to_thread(get_full_properties_batch, smiles_list)
+
+
+# Singleton instance
+mol_batcher = AsyncBatcher(_compute_batch, max_batch=64, max_wait_ms=20.0)
@@ -3,6 +3,7 @@ Molecular calculation engine using RDKit.
 Provides LogP calculations, molecular property analysis, and SMILES validation.
 """
 
+from functools import lru_cache
 from typing import Optional
 from dataclasses import dataclass
 
@@ -123,25 +124,30 @@ def estimate_vapor_pressure(smiles: str, temperature_c: float = 25.0) -> Optiona
         if mw is None or logp is None:
             return None
 
-        # Simplified empirical correlation
-        # log10(VP) = A - B*MW/1000 - C*LogP
-        # Coefficients derived from fragrance compound data
-        A = 2.5
-        B = 8.0
-        C = 0.3
+        return _vapor_pressure_from(mw, logp, temperature_c)
+    except Exception:
+        return None
 
-        log_vp = A - B * (mw / 1000) - C * logp
 
-        # Temperature correction using simplified Clausius-Clapeyron
-        # VP(T) = VP(25) * exp(dH/R * (1/298 - 1/T))
-        temp_k = temperature_c + 273.15
-        temp_factor = (temp_k / 298.15) ** 2  # Simplified
+def _vapor_pressure_from(mw: float, logp: float, temperature_c: float = 25.0) -> float:
+    """Empirical vapor pressure (mmHg) from already-computed MW and LogP."""
+    # Simplified empirical correlation
+    # log10(VP) = A - B*MW/1000 - C*LogP
+    # Coefficients derived from fragrance compound data
+    A = 2.5
+    B = 8.0
+    C = 0.3
 
-        vp = (10 ** log_vp) * temp_factor
+    log_vp = A - B * (mw / 1000) - C * logp
 
-        return round(vp, 6)
-    except Exception:
-        return None
+    # Temperature correction using simplified Clausius-Clapeyron
+    # VP(T) = VP(25) * exp(dH/R * (1/298 - 1/T))
+    temp_k = temperature_c + 273.15
+    temp_factor = (temp_k / 298.15) ** 2  # Simplified
+
+    vp = (10 ** log_vp) * temp_factor
+
+    return round(vp, 6)
 
 
 def classify_volatility(smiles: str) -> Optional[str]:
@@ -154,9 +160,11 @@ def classify_volatility(smiles: str) -> Optional[str]:
     Returns:
         "high", "medium", or "low"
     """
-    vp = estimate_vapor_pressure(smiles)
-    mw = calculate_molecular_weight(smiles)
+    return _volatility_from(estimate_vapor_pressure(smiles), calculate_molecular_weight(smiles))
+
 
+def _volatility_from(vp: Optional[float], mw: Optional[float]) -> Optional[str]:
+    """Volatility class from already-computed vapor pressure and MW."""
     if vp is None and mw is None:
         return None
 
@@ -180,10 +188,14 @@ def classify_volatility(smiles: str) -> Optional[str]:
     return None
 
 
+@lru_cache(maxsize=4096)
 def get_full_properties(smiles: str) -> MolecularProperties:
     """
     Calculate all available molecular properties for a SMILES string.
 
+    Results are memoized per SMILES string; callers share the returned
+    instance and must treat it as read-only.
+
     Args:
         smiles: SMILES string
 
@@ -216,8 +228,9 @@ def get_full_properties(smiles: str) -> MolecularProperties:
         h_donors = rdMolDescriptors.CalcNumHBD(mol)
         h_acceptors = rdMolDescriptors.CalcNumHBA(mol)
 
-        vp = estimate_vapor_pressure(smiles)
-        volatility = classify_volatility(smiles)
+        # Derive from the parsed descriptors instead of re-parsing the SMILES
+        vp = _vapor_pressure_from(mw, logp)
+        volatility = _volatility_from(vp, mw)
 
         return MolecularProperties(
             smiles=smiles,
@@ -246,6 +259,23 @@ def get_full_properties(smiles: str) -> MolecularProperties:
         )
 
 
+def get_full_properties_batch(smiles_list: list[str]) -> list[MolecularProperties]:
+    """
+    Calculate molecular properties for many SMILES strings in one call.
+
+    Duplicate SMILES within the batch are computed once; results are
+    returned in the same order as the input.
+
+    Args:
+        smiles_list: SMILES strings to analyze
+
+    Returns:
+        List of MolecularProperties, one per input SMILES
+    """
+    unique = {smiles: get_full_properties(smiles) for smiles in dict.fromkeys(smiles_list)}
+    return [unique[smiles] for smiles in smiles_list]
+
+
 def filter_by_logp(ingredients: list[dict], min_logp: float, max_logp: float = 10.0) -> list[dict]:
     """
     Filter ingredients by LogP range.
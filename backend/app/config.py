@@ -2,6 +2,7 @@
 Application configuration management.
 """
 
+import os
 from pathlib import Path
 from typing import Optional
 from pydantic_settings import BaseSettings
@@ -18,18 +19,29 @@ class Settings(BaseSettings):
     # Paths
     base_dir: Path = Path(__file__).parent.parent
     data_dir: Path = base_dir / "data"
+    # Generated artifacts (model exports, embedding caches) stay out of the source tree
+    cache_dir: Path = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "aether"
 
     # ChromaDB
-    chroma_persist_dir: str = str(base_dir / "data" / "chroma_db")
+    chroma_persist_dir: str = str(cache_dir / "chroma_db")
     chroma_collection_name: str = "physio_rules"
 
     # Embedding Model
     embedding_model: str = "all-MiniLM-L6-v2"
+    embedding_backend: str = "onnx-int8"  # "onnx-int8" or "torch"
+    embedding_quantization: Optional[str] = None  # arm64/avx2/avx512/avx512_vnni; auto-detected if unset
+    embedding_torch_bf16: Optional[bool] = None  # bfloat16 for the torch backend; auto-detected if unset
+    embedding_cache_dir: str = str(cache_dir / "models")
+    embedding_index_int8: bool = True  # int8-quantize the in-memory rule index
+    embedding_threads: Optional[int] = None  # intra-op threads per worker; cpu_count // web_concurrency if unset
 
     # OpenAI Configuration
     openai_api_key: Optional[str] = None
     openai_base_url: str = "https://newapi.deepwisdom.ai/v1"
     openai_model: str = "gpt-4o"
+    ai_request_timeout_seconds: float = 20.0  # Per chat completion (each SDK attempt)
+    ai_timeout_seconds: float = 60.0  # Overall budget for full_analysis: two sequential completions
+    ai_max_connections: int = 20
 
     # PayPal Configuration
     paypal_client_id: Optional[str] = None
@@ -38,6 +50,8 @@ class Settings(BaseSettings):
 
     # API Settings
     api_prefix: str = "/api"
+    threadpool_size: Optional[int] = None  # Threads for offloaded CPU-bound work per worker; threads_per_worker() if unset
+    web_concurrency: int = 1  # uvicorn worker processes (WEB_CONCURRENCY), used to split cores
 
     class Config:
         env_file = ".env"
@@ -45,3 +59,11 @@ class Settings(BaseSettings):
 
 
 settings = Settings()
+
+
+def threads_per_worker() -> int:
+    """Native math threads (torch/OpenMP/MKL) each worker process may use."""
+    if settings.embedding_threads:
+        return settings.embedding_threads
+    # Workers sharing the host must not each spin up one thread per core
+    return max(1, (os.cpu_count() or 1) // max(1, settings.web_concurrency))
@@ -0,0 +1,37 @@
+"""
+Async micro-batcher for AI formula generation.
+Coalesces concurrent /generate calls so identical requests share one OpenAI round trip.
+"""
+
+import asyncio
+
+from app.core.ai_service import ai_analyzer
+from app.core.async_batcher import AsyncBatcher
+
+
+def _payload_key(payload: dict) -> tuple:
+    """Hashable identity of a full_analysis payload."""
+    return tuple(sorted(payload.items()))
+
+
+async def _analyze_batch(payloads: list[dict]) -> list:
+    """
+    Run full_analysis once per distinct payload in the batch.
+
+    The chat completions API has no multi-prompt endpoint, so distinct
+    payloads still run concurrently as individual calls; duplicates within
+    the window reuse the same result. Failures are returned per item.
+    """
+    unique = {_payload_key(p): p for p in payloads}
+    results = await asyncio.gather(
+        *[ai_analyzer.full_analysis(**p) for p in unique.values()],
+        return_exceptions=True
+    )
+    by_key = dict(zip(unique, results))
+    return [by_key[_payload_key(p)] for p in payloads]
+
+
+# Singleton instance
+# Keyed by payload: each distinct request is its own dispatch, cancelled
+# (closing its OpenAI call) once every caller waiting on it has timed out
+ai_batcher = AsyncBatcher(_analyze_batch, max_batch=16, max_wait_ms=50.0, key_fn=_payload_key)
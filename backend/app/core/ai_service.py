@@ -7,7 +7,9 @@ import json
 import re
 from typing import Optional
 from dataclasses import dataclass, asdict
-from openai import OpenAI
+
+import httpx
+from openai import AsyncOpenAI
 
 from app.config import settings
 
@@ -121,16 +123,24 @@ Ensure total_concentration is between 10-20% for Eau de Parfum.
 Include 8-12 ingredients total."""
 
     def __init__(self):
-        self._client: Optional[OpenAI] = None
+        self._client: Optional[AsyncOpenAI] = None
 
-    def _get_client(self) -> OpenAI:
-        """Get or create OpenAI client."""
+    def _get_client(self) -> AsyncOpenAI:
+        """Get or create the async OpenAI client (pooled HTTP connections)."""
         if self._client is None:
             if not settings.openai_api_key:
                 raise ValueError("OPENAI_API_KEY not configured")
-            self._client = OpenAI(
+            self._client = AsyncOpenAI(
                 api_key=settings.openai_api_key,
-                base_url=settings.openai_base_url
+                base_url=settings.openai_base_url,
+                timeout=settings.ai_request_timeout_seconds,
+                http_client=httpx.AsyncClient(
+                    limits=httpx.Limits(
+                        max_connections=settings.ai_max_connections,
+                        max_keepalive_connections=settings.ai_max_connections
+                    ),
+                    timeout=httpx.Timeout(settings.ai_request_timeout_seconds, connect=5.0)
+                )
             )
         return self._client
 
@@ -194,7 +204,7 @@ Include 8-12 ingredients total."""
             temperature=temperature
         )
 
-        response = client.chat.completions.create(
+        response = await client.chat.completions.create(
             model=settings.openai_model,
             messages=[
                 {"role": "system", "content": self.SYSTEM_PROMPT},
@@ -249,7 +259,7 @@ Include 8-12 ingredients total."""
             temperature=temperature
         )
 
-        response = client.chat.completions.create(
+        response = await client.chat.completions.create(
             model=settings.openai_model,
             messages=[
                 {"role": "system", "content": self.SYSTEM_PROMPT},
@@ -0,0 +1,136 @@
+"""
+Generic async micro-batcher.
+Coalesces concurrent submissions into batched calls of a single coroutine.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+
+class AsyncBatcher:
+    """
+    Collects items submitted concurrently and processes them in batches.
+
+    The first pending item opens a batch window of `max_wait_ms`; the batch
+    is dispatched when the window closes or `max_batch` items are queued,
+    whichever comes first. An item arriving while the batcher is idle
+    (nothing queued, no batch in flight) is dispatched at once, so the
+    window only costs latency under concurrency. Each submitter awaits
+    only its own result.
+
+    Batches are dispatched as separate tasks, so a slow batch does not hold
+    up collection of the next one. A result that is an exception instance
+    is raised to its submitter only. With `key_fn`, each batch is split by
+    key and every key gets its own dispatch. A dispatch is cancelled once
+    every submitter waiting on it has been cancelled (e.g. timed out), so
+    abandoned upstream calls don't keep running.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[list], Awaitable[list]],
+        max_batch: int = 64,
+        max_wait_ms: float = 20.0,
+        key_fn: Optional[Callable[[Any], Hashable]] = None
+    ):
+        """
+        Args:
+            batch_fn: Coroutine mapping a list of items to a list of results (same order)
+            max_batch: Maximum items per batch
+            max_wait_ms: Maximum time the first item waits for companions
+            key_fn: Optional item key; items sharing a key are dispatched together
+                    and the dispatch is cancelled when all of their submitters are
+        """
+        self._batch_fn = batch_fn
+        self._key_fn = key_fn
+        self._max_batch = max_batch
+        self._max_wait = max_wait_ms / 1000.0
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._inflight: set[asyncio.Task] = set()
+
+    def _ensure_worker(self):
+        """Start the background worker on the running loop (lazily, on first submit)."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    async def submit(self, item: Any) -> Any:
+        """Queue an item and wait for its result from the next batch."""
+        self._ensure_worker()
+        future = self._loop.create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def _run(self):
+        """Drain the queue into batches forever."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self._max_wait
+            # An idle batcher (nothing queued behind this item, no batch in
+            # flight) dispatches at once: a lone request never waits out the window
+            idle = self._queue.empty() and not self._inflight
+
+            while not idle and len(batch) < self._max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout=timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # Submitters that gave up (e.g. request timeout) don't need results
+            batch = [(item, future) for item, future in batch if not future.done()]
+            if not batch:
+                continue
+
+            if self._key_fn is None:
+                groups = [batch]
+            else:
+                by_key: dict[Hashable, list] = {}
+                for entry in batch:
+                    by_key.setdefault(self._key_fn(entry[0]), []).append(entry)
+                groups = list(by_key.values())
+
+            for group in groups:
+                task = loop.create_task(self._dispatch(group))
+                self._inflight.add(task)
+                task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, batch: list[tuple[Any, asyncio.Future]]):
+        """Run one batch and resolve its futures."""
+        task = asyncio.current_task()
+        waiting = len(batch)
+
+        def _on_future_done(future: asyncio.Future):
+            # Every submitter gave up: stop the upstream work instead of
+            # letting it hold resources until it finishes
+            nonlocal waiting
+            if future.cancelled():
+                waiting -= 1
+                if waiting == 0 and not task.done():
+                    task.cancel()
+
+        for _, future in batch:
+            future.add_done_callback(_on_future_done)
+
+        try:
+            results = await self._batch_fn([item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
@@ -0,0 +1,85 @@
+"""
+Multi-keyword substring matching.
+Finds every keyword of a fixed set inside a text in one C-level regex scan.
+"""
+
+import re
+from bisect import bisect_right
+from typing import Iterable
+
+_SEPARATOR = "\x00"
+
+
+class KeywordMatcher:
+    """
+    Precompiled matcher over a fixed keyword set (Aho-Corasick semantics).
+
+    `contained_in(text)` returns every keyword that occurs in `text`,
+    including overlapping ones, equivalent to `[k for k in keywords if k in text]`.
+    `containing(text)` returns every keyword that contains `text`,
+    equivalent to `[k for k in keywords if text in k]`.
+
+    Results keep the keyword insertion order so callers relying on
+    "first match wins" behave exactly like the linear scans they replace.
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        self._keywords: list[str] = list(dict.fromkeys(keywords))
+        self._order = {k: i for i, k in enumerate(self._keywords)}
+
+        # Zero-width lookahead reports the longest keyword starting at every
+        # position; shorter keywords starting there are its prefixes.
+        longest_first = sorted(self._keywords, key=len, reverse=True)
+        self._pattern = re.compile(
+            "(?=(" + "|".join(re.escape(k) for k in longest_first) + "))"
+        ) if self._keywords else None
+        self._prefixes = {
+            k: [p for p in self._keywords if k.startswith(p)]
+            for k in self._keywords
+        }
+
+        # All keywords joined into one haystack for reverse containment
+        self._haystack = _SEPARATOR.join(self._keywords)
+        self._offsets = []
+        offset = 0
+        for k in self._keywords:
+            self._offsets.append(offset)
+            offset += len(k) + len(_SEPARATOR)
+
+    def __len__(self) -> int:
+        return len(self._keywords)
+
+    def contained_in(self, text: str) -> list[str]:
+        """Keywords that are substrings of `text`."""
+        if self._pattern is None:
+            return []
+
+        found = set()
+        for match in self._pattern.finditer(text):
+            found.update(self._prefixes[match.group(1)])
+        return sorted(found, key=self._order.__getitem__)
+
+    def containing(self, text: str) -> list[str]:
+        """Keywords that have `text` as a substring."""
+        if not text or _SEPARATOR in text:
+            return [k for k in self._keywords if text in k]
+
+        found = []
+        start = 0
+        while True:
+            pos = self._haystack.find(text, start)
+            if pos < 0:
+                break
+            idx = bisect_right(self._offsets, pos) - 1
+            found.append(self._keywords[idx])
+            # One hit per keyword is enough; resume at the next keyword
+            if idx + 1 >= len(self._offsets):
+                break
+            start = self._offsets[idx + 1]
+        return found
+
+    def matches(self, text: str) -> list[str]:
+        """Keywords that contain `text` or are contained in it."""
+        found = set(self.contained_in(text))
+        found.update(self.containing(text))
+        return sorted(found, key=self._order.__getitem__)
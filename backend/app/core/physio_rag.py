@@ -1,13 +1,35 @@
 """
 Physio-RAG Engine: Retrieval-Augmented Generation for physiological corrections.
-Uses ChromaDB with sentence-transformers for semantic similarity search.
+Uses sentence-transformers embeddings for semantic similarity search, with an
+in-memory index for small rule sets and ChromaDB for large ones. Rule
+embeddings are persisted on disk and only recomputed when the rules file or
+the embedding model changes.
 """
 
+import hashlib
 import json
-from typing import Optional
+import os
+import platform
+import shutil
+import tempfile
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
 from dataclasses import dataclass
 
-from app.config import settings
+from app.config import settings, threads_per_worker
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Up to this many rules a brute-force in-memory cosine index beats ChromaDB's
+# HNSW/SQLite setup cost; only larger corpora load the vector database
+NUMPY_INDEX_MAX_RULES = 2000
+
+# Condition operator codes, resolved once per rule at load
+OP_NONE, OP_LT, OP_GT, OP_EQ, OP_CONTAINS = -1, 0, 1, 2, 3
+_OP_CODES = {'<': OP_LT, '>': OP_GT, '==': OP_EQ, 'contains': OP_CONTAINS}
 
 
 @dataclass
@@ -21,6 +43,9 @@ class PhysioRule:
     threshold: Optional[dict] = None
     substitute: Optional[dict] = None
     reasoning: str = ""
+    document: str = ""  # Semantic text embedded for retrieval, built at load
+    op_code: int = OP_NONE  # Condition operator as an OP_* code, set at load
+    value_is_numeric: bool = False  # Condition value is an int/float threshold
 
 
 @dataclass
@@ -31,58 +56,290 @@ class RetrievedRule:
     matched_condition: str
 
 
+def _write_atomically(path: Path, write) -> None:
+    """
+    Write `path` via a temp file in the same directory and rename it into
+    place, so a concurrently booting worker never reads a truncated file.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{path.name}.", dir=path.parent)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+@lru_cache(maxsize=1)
+def _cpu_flags() -> str:
+    """Raw /proc/cpuinfo text (empty where unavailable)."""
+    try:
+        return Path("/proc/cpuinfo").read_text()
+    except OSError:
+        return ""
+
+
+def _detect_quantization_config() -> str:
+    """Pick the ONNX dynamic quantization preset matching the host CPU."""
+    if platform.machine().lower() in ("arm64", "aarch64"):
+        return "arm64"
+
+    flags = _cpu_flags()
+    if "avx512_vnni" in flags:
+        return "avx512_vnni"
+    if "avx512f" in flags:
+        return "avx512"
+    return "avx2"
+
+
+def _use_bf16() -> bool:
+    """Whether the PyTorch model should run in bfloat16 (auto: native bf16 CPUs only)."""
+    if settings.embedding_torch_bf16 is not None:
+        return settings.embedding_torch_bf16
+    # Without hardware support bf16 matmuls are emulated and slower than fp32
+    flags = _cpu_flags()
+    return "avx512_bf16" in flags or "amx_bf16" in flags
+
+
 class SentenceTransformerEmbedding:
-    """Custom embedding function using sentence-transformers."""
+    """
+    Custom embedding function using sentence-transformers.
+
+    With the "onnx-int8" backend the model is exported once to a dynamically
+    int8-quantized ONNX file (cached on disk) and served by ONNX Runtime.
+    Falls back to the PyTorch model if the ONNX extras are unavailable or
+    the export cannot be written. The PyTorch model is loaded in bfloat16
+    on CPUs with native bf16 support; embeddings are upcast to float32.
+    Intra-op threads of both backends (torch and the ONNX Runtime session)
+    are capped to this worker's share of the CPU cores.
+    """
 
     def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
         self._model = None
         self._model_name = model_name
+        self._bf16 = False
 
     def _load_model(self):
         if self._model is None:
             try:
                 from sentence_transformers import SentenceTransformer
-                self._model = SentenceTransformer(self._model_name)
             except ImportError:
                 raise ImportError("sentence-transformers required for embeddings")
 
+            import torch
+
+            # Under several workers the default (one thread per core each) oversubscribes the CPU
+            torch.set_num_threads(threads_per_worker())
+
+            if settings.embedding_backend == "onnx-int8":
+                self._model = self._load_quantized_onnx(SentenceTransformer)
+            if self._model is None:
+                self._model = self._load_torch(SentenceTransformer)
+
+    def _load_torch(self, model_cls):
+        """Load the PyTorch model, in bfloat16 where the CPU supports it natively."""
+        if _use_bf16():
+            try:
+                import torch
+
+                model = model_cls(self._model_name, model_kwargs={"torch_dtype": torch.bfloat16})
+                self._bf16 = True
+                return model
+            except Exception:
+                pass
+        return model_cls(self._model_name)
+
+    def _load_quantized_onnx(self, model_cls):
+        """Load (exporting on first use) the int8 ONNX model, or None on failure."""
+        config = settings.embedding_quantization or _detect_quantization_config()
+        file_suffix = f"qint8_{config}"
+        file_name = f"onnx/model_{file_suffix}.onnx"
+        export_dir = Path(settings.embedding_cache_dir) / f"{self._model_name.replace('/', '__')}__{file_suffix}"
+
+        try:
+            if not (export_dir / file_name).exists():
+                self._export_quantized_onnx(model_cls, config, file_suffix, export_dir)
+
+            import onnxruntime
+
+            # ORT sizes its own intra-op pool to the physical cores; torch and
+            # OMP/MKL thread limits do not reach it
+            session_options = onnxruntime.SessionOptions()
+            session_options.intra_op_num_threads = threads_per_worker()
+
+            return model_cls(
+                str(export_dir),
+                backend="onnx",
+                model_kwargs={"file_name": file_name, "session_options": session_options}
+            )
+        except Exception:
+            # Missing optimum/onnxruntime, read-only filesystem, offline host...
+            return None
+
+    def _export_quantized_onnx(self, model_cls, config: str, file_suffix: str, export_dir: Path):
+        """
+        Export and quantize the model into a scratch directory, then rename it
+        into place, so workers booting together never load a half-written file.
+        """
+        from sentence_transformers import export_dynamic_quantized_onnx_model
+
+        export_dir.parent.mkdir(parents=True, exist_ok=True)
+        scratch_dir = tempfile.mkdtemp(prefix=f".{export_dir.name}.", dir=export_dir.parent)
+        try:
+            onnx_model = model_cls(self._model_name, backend="onnx")
+            onnx_model.save(scratch_dir)
+            export_dynamic_quantized_onnx_model(
+                onnx_model,
+                quantization_config=config,
+                model_name_or_path=scratch_dir,
+                file_suffix=file_suffix
+            )
+            try:
+                os.replace(scratch_dir, export_dir)
+            except OSError:
+                # Another worker finished its export first; keep that one
+                if not export_dir.is_dir():
+                    raise
+        finally:
+            shutil.rmtree(scratch_dir, ignore_errors=True)
+
     def __call__(self, input: list[str]) -> list[list[float]]:
         """Generate embeddings for input texts."""
         self._load_model()
-        embeddings = self._model.encode(input, convert_to_numpy=True)
+        # One batch for the whole input: the rule corpus is tokenized in a single call
+        batch_size = max(32, len(input))
+        if self._bf16:
+            # numpy has no bfloat16; upcast the pooled output before converting
+            embeddings = self._model.encode(
+                input, batch_size=batch_size, convert_to_tensor=True, show_progress_bar=False
+            )
+            return embeddings.float().cpu().numpy().tolist()
+        embeddings = self._model.encode(
+            input, batch_size=batch_size, convert_to_numpy=True, show_progress_bar=False
+        )
         return embeddings.tolist()
 
 
+_MISSING = object()
+
+
+def _build_query_text(ph, skin_type, temperature, allergies) -> str:
+    """Build the semantic query for a profile; absent fields are _MISSING."""
+    query_parts = []
+
+    if ph is not _MISSING:
+        query_parts.append(f"pH level {ph}")
+        if ph < 5.2:
+            query_parts.append("acidic skin chemistry faster evaporation")
+        elif ph > 5.8:
+            query_parts.append("alkaline skin chemistry slower breakdown")
+
+    if skin_type is not _MISSING:
+        skin = skin_type.lower()
+        query_parts.append(f"skin type {skin}")
+        if skin == "dry":
+            query_parts.append("low sebum fast absorption")
+        elif skin == "oily":
+            query_parts.append("high sebum enhanced projection")
+
+    if temperature is not _MISSING:
+        query_parts.append(f"body temperature {temperature}")
+        if temperature > 37.0:
+            query_parts.append("warm skin fast diffusion")
+        elif temperature < 36.0:
+            query_parts.append("cool skin slow evaporation")
+
+    if allergies is not _MISSING:
+        for allergy in allergies:
+            query_parts.append(f"allergen sensitivity {allergy}")
+
+    return " ".join(query_parts)
+
+
+@lru_cache(maxsize=4096)
+def _cached_query_text(ph_type, ph, skin_type, temperature_type, temperature, allergies) -> str:
+    # Value types are part of the key: 5 == 5.0 but they format differently
+    return _build_query_text(ph, skin_type, temperature, allergies)
+
+
+def _profile_query_text(user_profile: dict) -> str:
+    """Query text for a profile, memoized on its exact field values."""
+    ph = user_profile.get('ph', _MISSING)
+    skin_type = user_profile.get('skin_type', _MISSING)
+    temperature = user_profile.get('temperature', _MISSING)
+    allergies = _MISSING
+    if 'allergies' in user_profile:
+        allergies = tuple(user_profile['allergies'])
+        if not all(type(allergy) is str for allergy in allergies):
+            return _build_query_text(ph, skin_type, temperature, allergies)
+
+    try:
+        return _cached_query_text(type(ph), ph, skin_type, type(temperature), temperature, allergies)
+    except TypeError:
+        # Unhashable profile values
+        return _build_query_text(ph, skin_type, temperature, allergies)
+
+
 class PhysioRAG:
     """
     Physio-RAG Engine for retrieving physiological correction rules.
 
-    Uses ChromaDB with sentence-transformers for semantic similarity search
-    to find relevant rules based on user physiological profile.
+    Uses sentence-transformers embeddings for semantic similarity search
+    to find relevant rules based on user physiological profile. Small rule
+    sets are searched with an in-memory cosine index, large ones via ChromaDB.
     """
 
     def __init__(self):
         self._rules: list[PhysioRule] = []
+        self._rules_by_id: dict[str, PhysioRule] = {}
+        self._rules_fingerprint = ""  # sha256 of rules file + embedding config
+        # Condition index (struct-of-arrays for numeric thresholds), see _build_condition_index
+        self._numeric_conditions: dict[str, tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+        self._equals_conditions: dict[str, list[tuple[int, object]]] = {}
+        self._contains_conditions: dict[str, list[tuple[int, object]]] = {}
         self._collection = None
+        self._rule_embeddings: Optional[np.ndarray] = None  # (n_rules, dim), unit rows
+        self._rule_scale: Optional[np.ndarray] = None  # per-dimension int8 scale, if quantized
         self._embedder: Optional[SentenceTransformerEmbedding] = None
         self._initialized = False
+        self._init_lock = threading.Lock()
+        # Per-instance memo of query text -> ranked (rule_id, relevance) hits
+        self._cached_vector_hits = lru_cache(maxsize=1024)(self._vector_hits)
 
     def initialize(self, use_vector_db: bool = True):
         """
         Initialize the RAG engine.
 
         Args:
-            use_vector_db: Whether to use ChromaDB for vector search.
+            use_vector_db: Whether to use vector search (in-memory index for
+                          small rule sets, ChromaDB otherwise).
                           If False, uses simple keyword matching.
         """
         self._load_rules()
 
         if use_vector_db:
             self._setup_embedder()
-            self._setup_vector_db()
+            if len(self._rules) <= NUMPY_INDEX_MAX_RULES:
+                self._collection = None
+                self._setup_numpy_index()
+            else:
+                self._setup_vector_db()
 
         self._initialized = True
 
+    def _ensure_initialized(self):
+        """Initialize once, even when first queried from several worker threads."""
+        if self._initialized:
+            return
+        with self._init_lock:
+            if not self._initialized:
+                self.initialize()
+
     def _setup_embedder(self):
         """Initialize sentence-transformers embedder."""
         try:
@@ -94,12 +351,17 @@ class PhysioRAG:
         """Load physio rules from JSON file."""
         rules_path = settings.data_dir / "physio_rules.json"
 
+        self._rules = []
+        self._rules_by_id = {}
+        self._rules_fingerprint = ""
+        self._cached_vector_hits.cache_clear()
+        self._build_condition_index()
         if not rules_path.exists():
-            self._rules = []
             return
 
-        with open(rules_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        raw = rules_path.read_bytes()
+        data = json.loads(raw)
+        self._rules_fingerprint = self._fingerprint(raw)
 
         for rule_data in data.get('rules', []):
             rule = PhysioRule(
@@ -112,19 +374,181 @@ class PhysioRAG:
                 substitute=rule_data.get('substitute'),
                 reasoning=rule_data.get('reasoning', '')
             )
+            value = rule.condition.get('value')
+            rule.op_code = _OP_CODES.get(rule.condition.get('operator', ''), OP_NONE)
+            rule.value_is_numeric = isinstance(value, (int, float))
+            rule.document = self._build_document(rule)
             self._rules.append(rule)
+            self._rules_by_id.setdefault(rule.id, rule)
+
+        self._build_condition_index()
+
+    @staticmethod
+    def _fingerprint(rules_bytes: bytes) -> str:
+        """Hash the rules file together with everything that shapes its embeddings."""
+        digest = hashlib.sha256(rules_bytes)
+        if settings.embedding_backend == "onnx-int8":
+            quantization = settings.embedding_quantization or _detect_quantization_config()
+        else:
+            quantization = "bf16" if _use_bf16() else "fp32"
+        digest.update(f"|{settings.embedding_model}|{settings.embedding_backend}|{quantization}".encode())
+        return digest.hexdigest()
+
+    def _build_condition_index(self):
+        """
+        Index rule conditions by parameter for vectorized evaluation.
+
+        Numeric '<'/'>' thresholds become per-parameter arrays of
+        (rule index, threshold, is_greater_than); '==' and 'contains'
+        conditions go into small per-parameter lists. Rules with no value
+        or an operator that can never match are left out.
+        """
+        import numpy as np
+
+        numeric: dict[str, tuple[list, list, list]] = {}
+        equals: dict[str, list[tuple[int, object]]] = {}
+        contains: dict[str, list[tuple[int, object]]] = {}
+
+        for idx, rule in enumerate(self._rules):
+            condition = rule.condition
+            param = condition.get('parameter', '')
+            value = condition.get('value')
+            op_code = rule.op_code
+
+            if value is None:
+                continue
+
+            if op_code == OP_LT or op_code == OP_GT:
+                if rule.value_is_numeric:
+                    indices, thresholds, is_gt = numeric.setdefault(param, ([], [], []))
+                    indices.append(idx)
+                    thresholds.append(value)
+                    is_gt.append(op_code == OP_GT)
+            elif op_code == OP_EQ:
+                equals.setdefault(param, []).append((idx, value))
+            elif op_code == OP_CONTAINS:
+                contains.setdefault(param, []).append((idx, value))
+
+        self._numeric_conditions = {
+            param: (
+                np.array(indices, dtype=np.intp),
+                np.array(thresholds, dtype=np.float64),
+                np.array(is_gt, dtype=bool)
+            )
+            for param, (indices, thresholds, is_gt) in numeric.items()
+        }
+        self._equals_conditions = equals
+        self._contains_conditions = contains
+
+    def _match_rule_indices(self, user_profile: dict) -> list[int]:
+        """Indices (in rule order) of rules whose condition holds for the profile."""
+        import numpy as np
+
+        matched: list[int] = []
+
+        for param, user_value in user_profile.items():
+            numeric = self._numeric_conditions.get(param)
+            if numeric is not None and isinstance(user_value, (int, float)):
+                indices, thresholds, is_gt = numeric
+                hits = np.where(is_gt, user_value > thresholds, user_value < thresholds)
+                matched.extend(indices[hits].tolist())
+
+            for idx, value in self._equals_conditions.get(param, ()):
+                if user_value == value:
+                    matched.append(idx)
+
+            if isinstance(user_value, list):
+                for idx, value in self._contains_conditions.get(param, ()):
+                    if value in user_value:
+                        matched.append(idx)
+
+        matched.sort()
+        return matched
+
+    def _setup_numpy_index(self):
+        """
+        Build the normalized float32 rule matrix, reusing the on-disk copy when
+        the rules fingerprint matches; otherwise embed all documents in one batch.
+        """
+        import numpy as np
+
+        self._rule_embeddings = None
+        if not self._embedder or not self._rules:
+            return
+
+        cache_path = Path(settings.embedding_cache_dir) / f"physio_rules_{self._rules_fingerprint[:16]}.npy"
+        embeddings = None
+        try:
+            cached = np.load(cache_path)
+            if cached.ndim == 2 and cached.shape[0] == len(self._rules):
+                embeddings = cached.astype(np.float32, copy=False)
+        except (OSError, ValueError):
+            pass
+
+        if embeddings is None:
+            try:
+                embeddings = np.asarray(self._embedder([rule.document for rule in self._rules]), dtype=np.float32)
+            except Exception:
+                # Embedder unavailable - fall back to keyword matching
+                return
+
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            embeddings = embeddings / np.maximum(norms, 1e-12)
+
+            try:
+                _write_atomically(cache_path, lambda f: np.save(f, embeddings))
+            except OSError:
+                # Read-only filesystem: just re-embed on the next boot
+                pass
+
+        if settings.embedding_index_int8:
+            # Per-dimension symmetric scalar quantization: 4x smaller matrix
+            max_abs = np.abs(embeddings).max(axis=0)
+            scale = np.where(max_abs > 0, 127.0 / np.maximum(max_abs, 1e-12), 1.0).astype(np.float32)
+            self._rule_embeddings = np.round(embeddings * scale).astype(np.int8)
+            self._rule_scale = scale
+        else:
+            self._rule_embeddings = embeddings
+            self._rule_scale = None
 
     def _setup_vector_db(self):
-        """Set up ChromaDB collection with sentence-transformer embeddings."""
+        """
+        Set up ChromaDB collection with sentence-transformer embeddings.
+
+        The collection is persisted under `chroma_persist_dir` and only
+        rebuilt when the rules fingerprint stored next to it changes.
+        """
         try:
             import chromadb
             from chromadb.config import Settings as ChromaSettings
 
-            # Initialize ChromaDB client (in-memory for MVP)
-            client = chromadb.Client(ChromaSettings(
-                anonymized_telemetry=False,
-                is_persistent=False
-            ))
+            persist_dir = Path(settings.chroma_persist_dir)
+            hash_path = persist_dir / "rules.sha256"
+            try:
+                client = chromadb.PersistentClient(
+                    path=str(persist_dir),
+                    settings=ChromaSettings(anonymized_telemetry=False)
+                )
+                persistent = True
+            except Exception:
+                # Unwritable data dir - keep the old in-memory behaviour
+                client = chromadb.Client(ChromaSettings(
+                    anonymized_telemetry=False,
+                    is_persistent=False
+                ))
+                persistent = False
+
+            if persistent:
+                try:
+                    stored = hash_path.read_text().strip()
+                except OSError:
+                    stored = ""
+                if stored != self._rules_fingerprint:
+                    # Rules or embedding model changed: drop stale vectors
+                    try:
+                        client.delete_collection(settings.chroma_collection_name)
+                    except Exception:
+                        pass
 
             # Create collection with custom embedding function if available
             if self._embedder:
@@ -142,61 +566,70 @@ class PhysioRAG:
             # Embed rules if collection is empty
             if self._collection.count() == 0:
                 self._embed_rules()
+                if persistent:
+                    try:
+                        _write_atomically(hash_path, lambda f: f.write(self._rules_fingerprint.encode()))
+                    except OSError:
+                        pass
 
         except ImportError:
             # Fallback to keyword matching if ChromaDB not available
             self._collection = None
 
+    def _build_document(self, rule: PhysioRule) -> str:
+        """Build the rich semantic document embedded for a rule."""
+        condition = rule.condition
+        param = condition.get('parameter', '')
+        operator = condition.get('operator', '')
+        value = condition.get('value', '')
+
+        # Create rich semantic document for better retrieval
+        doc_parts = [
+            f"Condition: {param} {operator} {value}",
+            f"Affects: {rule.target}",
+            f"Action: {rule.action}",
+        ]
+        if rule.factor:
+            doc_parts.append(f"Adjustment factor: {rule.factor}")
+        if rule.reasoning:
+            doc_parts.append(f"Reasoning: {rule.reasoning}")
+
+        # Add semantic expansion for better matching
+        try:
+            semantic_hints = self._get_semantic_hints(param, operator, value)
+        except TypeError:
+            # Unhashable condition value (e.g. a list): skip the memo
+            semantic_hints = self._get_semantic_hints.__wrapped__(param, operator, value)
+        if semantic_hints:
+            doc_parts.append(f"Related concepts: {semantic_hints}")
+
+        return " | ".join(doc_parts)
+
     def _embed_rules(self):
         """Embed rules into the vector database with rich semantic content."""
         if not self._collection or not self._rules:
             return
 
-        documents = []
-        ids = []
-        metadatas = []
-
-        for rule in self._rules:
-            condition = rule.condition
-            param = condition.get('parameter', '')
-            operator = condition.get('operator', '')
-            value = condition.get('value', '')
-
-            # Create rich semantic document for better retrieval
-            doc_parts = [
-                f"Condition: {param} {operator} {value}",
-                f"Affects: {rule.target}",
-                f"Action: {rule.action}",
-            ]
-            if rule.factor:
-                doc_parts.append(f"Adjustment factor: {rule.factor}")
-            if rule.reasoning:
-                doc_parts.append(f"Reasoning: {rule.reasoning}")
-
-            # Add semantic expansion for better matching
-            semantic_hints = self._get_semantic_hints(param, operator, value)
-            if semantic_hints:
-                doc_parts.append(f"Related concepts: {semantic_hints}")
-
-            documents.append(" | ".join(doc_parts))
-            ids.append(rule.id)
-            metadatas.append({
-                "target": rule.target,
-                "action": rule.action,
-                "parameter": param,
-                "operator": operator,
-                "value": str(value),
-                "factor": str(rule.factor) if rule.factor else ""
-            })
-
         self._collection.add(
-            documents=documents,
-            ids=ids,
-            metadatas=metadatas
+            documents=[rule.document for rule in self._rules],
+            ids=[rule.id for rule in self._rules],
+            metadatas=[
+                {
+                    "target": rule.target,
+                    "action": rule.action,
+                    "parameter": rule.condition.get('parameter', ''),
+                    "operator": rule.condition.get('operator', ''),
+                    "value": str(rule.condition.get('value', '')),
+                    "factor": str(rule.factor) if rule.factor else ""
+                }
+                for rule in self._rules
+            ]
         )
 
-    def _get_semantic_hints(self, param: str, operator: str, value) -> str:
-        """Generate semantic hints for better embedding similarity."""
+    @staticmethod
+    @lru_cache(maxsize=128)
+    def _get_semantic_hints(param: str, operator: str, value) -> str:
+        """Generate semantic hints for better embedding similarity (memoized; few distinct conditions)."""
         hints = []
 
         if param == "ph":
@@ -230,66 +663,25 @@ class PhysioRAG:
         Returns:
             List of RetrievedRule objects sorted by relevance
         """
-        if not self._initialized:
-            self.initialize()
-
-        # Build semantic query from profile
-        query_parts = []
-
-        if 'ph' in user_profile:
-            ph = user_profile['ph']
-            query_parts.append(f"pH level {ph}")
-            if ph < 5.2:
-                query_parts.append("acidic skin chemistry faster evaporation")
-            elif ph > 5.8:
-                query_parts.append("alkaline skin chemistry slower breakdown")
-
-        if 'skin_type' in user_profile:
-            skin = user_profile['skin_type'].lower()
-            query_parts.append(f"skin type {skin}")
-            if skin == "dry":
-                query_parts.append("low sebum fast absorption")
-            elif skin == "oily":
-                query_parts.append("high sebum enhanced projection")
-
-        if 'temperature' in user_profile:
-            temp = user_profile['temperature']
-            query_parts.append(f"body temperature {temp}")
-            if temp > 37.0:
-                query_parts.append("warm skin fast diffusion")
-            elif temp < 36.0:
-                query_parts.append("cool skin slow evaporation")
-
-        if 'allergies' in user_profile:
-            for allergy in user_profile.get('allergies', []):
-                query_parts.append(f"allergen sensitivity {allergy}")
-
-        query_text = " ".join(query_parts)
-
-        if self._collection is not None:
+        self._ensure_initialized()
+
+        query_text = _profile_query_text(user_profile)
+
+        if self._rule_embeddings is not None or self._collection is not None:
             return self._vector_query(query_text, n_results)
         else:
             return self._keyword_query(user_profile, n_results)
 
     def _vector_query(self, query_text: str, n_results: int) -> list[RetrievedRule]:
-        """Query using ChromaDB vector similarity with sentence-transformers."""
-        if self._collection is None:
+        """Query by vector similarity (in-memory index or ChromaDB)."""
+        if self._rule_embeddings is None and self._collection is None:
             return []
 
-        results = self._collection.query(
-            query_texts=[query_text],
-            n_results=n_results
-        )
-
+        # Repeated profiles produce the same query text; skip the embedding pass
         retrieved = []
-        ids = results.get('ids', [[]])[0]
-        distances = results.get('distances', [[]])[0]
-
-        for i, rule_id in enumerate(ids):
+        for rule_id, relevance in self._cached_vector_hits(query_text, n_results):
             rule = self._get_rule_by_id(rule_id)
             if rule:
-                distance = distances[i] if i < len(distances) else 1.0
-                relevance = 1.0 / (1.0 + distance)
                 retrieved.append(RetrievedRule(
                     rule=rule,
                     relevance_score=relevance,
@@ -298,49 +690,76 @@ class PhysioRAG:
 
         return retrieved
 
+    def _vector_hits(self, query_text: str, n_results: int) -> tuple[tuple[str, float], ...]:
+        """Run the vector search, returning immutable (rule_id, relevance) pairs."""
+        if self._rule_embeddings is not None:
+            return self._numpy_hits(query_text, n_results)
+
+        results = self._collection.query(
+            query_texts=[query_text],
+            n_results=n_results
+        )
+
+        ids = results.get('ids', [[]])[0]
+        distances = results.get('distances', [[]])[0]
+
+        hits = []
+        for i, rule_id in enumerate(ids):
+            distance = distances[i] if i < len(distances) else 1.0
+            hits.append((rule_id, 1.0 / (1.0 + distance)))
+        return tuple(hits)
+
+    def _numpy_hits(self, query_text: str, n_results: int) -> tuple[tuple[str, float], ...]:
+        """Brute-force cosine search over the in-memory rule embeddings."""
+        import numpy as np
+
+        k = min(n_results, len(self._rules))
+        if k <= 0:
+            return ()
+
+        query_vec = np.asarray(self._embedder([query_text])[0], dtype=np.float32)
+        query_vec /= max(float(np.linalg.norm(query_vec)), 1e-12)
+
+        if self._rule_scale is not None:
+            # E ~ E_i8 / scale, so E @ q ~ E_i8 @ (q / scale); quantize that
+            # vector with its own scalar scale and accumulate in int32
+            scaled = query_vec / self._rule_scale
+            q_scale = 127.0 / max(float(np.abs(scaled).max()), 1e-12)
+            query_i32 = np.round(scaled * q_scale).astype(np.int32)
+            scores = (self._rule_embeddings @ query_i32) / q_scale
+        else:
+            scores = self._rule_embeddings @ query_vec
+
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+
+        # Squared L2 between unit vectors (2 - 2cos), matching Chroma's default
+        # distance so relevance scores keep the same scale
+        distances = np.maximum(2.0 - 2.0 * scores[top], 0.0)
+        return tuple(
+            (self._rules[idx].id, 1.0 / (1.0 + float(distance)))
+            for idx, distance in zip(top.tolist(), distances.tolist())
+        )
+
     def _keyword_query(self, user_profile: dict, n_results: int) -> list[RetrievedRule]:
         """Fallback keyword-based matching when vector DB not available."""
         matched = []
 
-        for rule in self._rules:
+        for idx in self._match_rule_indices(user_profile):
+            rule = self._rules[idx]
             condition = rule.condition
-            param = condition.get('parameter', '')
-            operator = condition.get('operator', '')
-            value = condition.get('value')
-
-            if param not in user_profile or value is None:
-                continue
-
-            user_value = user_profile[param]
-            matches = False
-            relevance = 0.5
-
-            if operator == '<' and isinstance(user_value, (int, float)) and isinstance(value, (int, float)):
-                matches = user_value < value
-            elif operator == '>' and isinstance(user_value, (int, float)) and isinstance(value, (int, float)):
-                matches = user_value > value
-            elif operator == '==':
-                matches = user_value == value
-            elif operator == 'contains' and isinstance(user_value, list):
-                matches = value in user_value
-
-            if matches:
-                relevance = 0.9
-                matched.append(RetrievedRule(
-                    rule=rule,
-                    relevance_score=relevance,
-                    matched_condition=f"{param} {operator} {value}"
-                ))
+            matched.append(RetrievedRule(
+                rule=rule,
+                relevance_score=0.9,
+                matched_condition=f"{condition.get('parameter', '')} {condition.get('operator', '')} {condition.get('value')}"
+            ))
 
-        matched.sort(key=lambda x: x.relevance_score, reverse=True)
+        # All condition matches share one relevance score, so rule order is kept
         return matched[:n_results]
 
     def _get_rule_by_id(self, rule_id: str) -> Optional[PhysioRule]:
         """Get a rule by its ID."""
-        for rule in self._rules:
-            if rule.id == rule_id:
-                return rule
-        return None
+        return self._rules_by_id.get(rule_id)
 
     def get_applicable_rules(self, user_profile: dict) -> list[PhysioRule]:
         """
@@ -352,34 +771,9 @@ class PhysioRAG:
         Returns:
             List of applicable PhysioRule objects
         """
-        if not self._initialized:
-            self.initialize()
-
-        applicable = []
-
-        for rule in self._rules:
-            condition = rule.condition
-            param = condition.get('parameter', '')
-            operator = condition.get('operator', '')
-            value = condition.get('value')
-
-            if param not in user_profile or value is None:
-                continue
-
-            user_value = user_profile[param]
-
-            if operator == '<' and isinstance(user_value, (int, float)) and isinstance(value, (int, float)):
-                if user_value < value:
-                    applicable.append(rule)
-            elif operator == '>' and isinstance(user_value, (int, float)) and isinstance(value, (int, float)):
-                if user_value > value:
-                    applicable.append(rule)
-            elif operator == '==' and user_value == value:
-                applicable.append(rule)
-            elif operator == 'contains' and isinstance(user_value, list) and value in user_value:
-                applicable.append(rule)
+        self._ensure_initialized()
 
-        return applicable
+        return [self._rules[idx] for idx in self._match_rule_indices(user_profile)]
 
 
 # Singleton instance
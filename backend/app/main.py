@@ -2,16 +2,46 @@
 Aether FastAPI Application Entry Point.
 """
 
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.config import settings
+from app.config import settings, threads_per_worker
+
+# Cap OpenMP/MKL pools before numpy/torch load; they read these once at import
+os.environ.setdefault("OMP_NUM_THREADS", str(threads_per_worker()))
+os.environ.setdefault("MKL_NUM_THREADS", str(threads_per_worker()))
+
 from app.api.routes import calibration, formulation, payment
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Size the worker thread pool used for CPU-bound endpoint work."""
+    # asyncio.to_thread offloads (RDKit, IFRA, pH analysis) use the loop's
+    # default executor; CPU-bound threads beyond this worker's core share only
+    # contend with the other workers and the ONNX/OpenMP pools. anyio's limiter
+    # (sync endpoints, UploadFile I/O) keeps its default.
+    executor = ThreadPoolExecutor(
+        max_workers=settings.threadpool_size or threads_per_worker(),
+        thread_name_prefix="aether"
+    )
+    asyncio.get_running_loop().set_default_executor(executor)
+    try:
+        yield
+    finally:
+        executor.shutdown(wait=False)
+
+
 app = FastAPI(
     title=settings.app_name,
     version=settings.app_version,
     description="AI-Driven Adaptive Perfume Formulation Platform",
+    lifespan=lifespan,
 )
 
 # CORS middleware for frontend
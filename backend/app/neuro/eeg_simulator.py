@@ -4,9 +4,66 @@ Generates realistic valence-arousal signals based on user input patterns.
 """
 
 import random
+import time
 from dataclasses import dataclass
 from typing import Optional
-import numpy as np
+
+from app.core.keyword_matcher import KeywordMatcher
+
+
+# Positive valence keywords
+POSITIVE_KEYWORDS = {
+    'happy': 0.3, 'joy': 0.35, 'love': 0.4, 'beautiful': 0.25,
+    'fresh': 0.2, 'bright': 0.2, 'warm': 0.15, 'soft': 0.1,
+    'peaceful': 0.25, 'calm': 0.2, 'serene': 0.25, 'gentle': 0.15,
+    'sweet': 0.2, 'romantic': 0.3, 'dreamy': 0.2, 'cozy': 0.2,
+    'spring': 0.2, 'summer': 0.15, 'morning': 0.15, 'sunshine': 0.25,
+    'garden': 0.15, 'flowers': 0.2, 'rain': 0.1, 'ocean': 0.15
+}
+
+# Negative valence keywords
+NEGATIVE_KEYWORDS = {
+    'sad': -0.3, 'dark': -0.15, 'cold': -0.1, 'lonely': -0.25,
+    'intense': -0.1, 'mysterious': -0.05, 'deep': -0.05,
+    'smoky': -0.1, 'heavy': -0.15
+}
+
+# High arousal keywords
+HIGH_AROUSAL_KEYWORDS = {
+    'energy': 0.3, 'exciting': 0.35, 'vibrant': 0.3, 'powerful': 0.25,
+    'intense': 0.25, 'bold': 0.2, 'strong': 0.2, 'spicy': 0.15,
+    'citrus': 0.15, 'electric': 0.3, 'party': 0.3, 'dance': 0.25
+}
+
+# Low arousal keywords
+LOW_AROUSAL_KEYWORDS = {
+    'calm': -0.25, 'peaceful': -0.3, 'relaxing': -0.35, 'quiet': -0.2,
+    'soft': -0.15, 'gentle': -0.2, 'meditative': -0.35, 'sleep': -0.4,
+    'tranquil': -0.3, 'serene': -0.3, 'evening': -0.15, 'night': -0.2
+}
+
+# (axis, table) pairs in scoring order
+_EMOTION_KEYWORD_TABLES = (
+    ("valence", POSITIVE_KEYWORDS),
+    ("valence", NEGATIVE_KEYWORDS),
+    ("arousal", HIGH_AROUSAL_KEYWORDS),
+    ("arousal", LOW_AROUSAL_KEYWORDS),
+)
+
+
+def _build_keyword_entries() -> dict[str, tuple[tuple[int, str, float], ...]]:
+    """Map each keyword to its (scoring order, axis, score) entries; some words score on both axes."""
+    entries: dict[str, list[tuple[int, str, float]]] = {}
+    order = 0
+    for axis, table in _EMOTION_KEYWORD_TABLES:
+        for word, score in table.items():
+            entries.setdefault(word, []).append((order, axis, score))
+            order += 1
+    return {word: tuple(word_entries) for word, word_entries in entries.items()}
+
+
+# Noise std per time series sample: valence, arousal, alpha, beta, theta, confidence
+_TIME_SERIES_NOISE_STD = (0.02, 0.02, 0.5, 0.3, 0.4, 0.05)
 
 
 @dataclass
@@ -33,10 +90,16 @@ class EEGSimulator:
     Real EEG processing would use MNE-Python with actual electrode data.
     """
 
+    # Keyword tables compiled once for all instances (plain substring
+    # semantics, as before - no word boundaries)
+    _KEYWORD_ENTRIES = _build_keyword_entries()
+    _KEYWORD_MATCHER = KeywordMatcher(_KEYWORD_ENTRIES)
+
     def __init__(self, seed: Optional[int] = None):
+        self._seed = seed
+        self._np_rng = None  # numpy Generator, created on first vectorized use
         if seed is not None:
             random.seed(seed)
-            np.random.seed(seed)
 
         self._baseline_alpha = 10.0  # microvolts
         self._baseline_beta = 5.0
@@ -56,56 +119,20 @@ class EEGSimulator:
         """
         text_lower = text_input.lower()
 
-        # Keyword-based emotion detection
+        # Keyword-based emotion detection: one scan finds every keyword, then
+        # scores are summed in keyword-table order
         valence_score = 0.0
         arousal_score = 0.5  # Neutral baseline
 
-        # Positive valence keywords
-        positive_keywords = {
-            'happy': 0.3, 'joy': 0.35, 'love': 0.4, 'beautiful': 0.25,
-            'fresh': 0.2, 'bright': 0.2, 'warm': 0.15, 'soft': 0.1,
-            'peaceful': 0.25, 'calm': 0.2, 'serene': 0.25, 'gentle': 0.15,
-            'sweet': 0.2, 'romantic': 0.3, 'dreamy': 0.2, 'cozy': 0.2,
-            'spring': 0.2, 'summer': 0.15, 'morning': 0.15, 'sunshine': 0.25,
-            'garden': 0.15, 'flowers': 0.2, 'rain': 0.1, 'ocean': 0.15
-        }
-
-        # Negative valence keywords
-        negative_keywords = {
-            'sad': -0.3, 'dark': -0.15, 'cold': -0.1, 'lonely': -0.25,
-            'intense': -0.1, 'mysterious': -0.05, 'deep': -0.05,
-            'smoky': -0.1, 'heavy': -0.15
-        }
-
-        # High arousal keywords
-        high_arousal_keywords = {
-            'energy': 0.3, 'exciting': 0.35, 'vibrant': 0.3, 'powerful': 0.25,
-            'intense': 0.25, 'bold': 0.2, 'strong': 0.2, 'spicy': 0.15,
-            'citrus': 0.15, 'electric': 0.3, 'party': 0.3, 'dance': 0.25
-        }
-
-        # Low arousal keywords
-        low_arousal_keywords = {
-            'calm': -0.25, 'peaceful': -0.3, 'relaxing': -0.35, 'quiet': -0.2,
-            'soft': -0.15, 'gentle': -0.2, 'meditative': -0.35, 'sleep': -0.4,
-            'tranquil': -0.3, 'serene': -0.3, 'evening': -0.15, 'night': -0.2
-        }
-
-        # Calculate scores
-        for word, score in positive_keywords.items():
-            if word in text_lower:
-                valence_score += score
+        entries = []
+        for word in self._KEYWORD_MATCHER.contained_in(text_lower):
+            entries.extend(self._KEYWORD_ENTRIES[word])
+        entries.sort()
 
-        for word, score in negative_keywords.items():
-            if word in text_lower:
+        for _, axis, score in entries:
+            if axis == "valence":
                 valence_score += score
-
-        for word, score in high_arousal_keywords.items():
-            if word in text_lower:
-                arousal_score += score
-
-        for word, score in low_arousal_keywords.items():
-            if word in text_lower:
+            else:
                 arousal_score += score
 
         # Clamp values
@@ -156,8 +183,6 @@ class EEGSimulator:
 
     def _generate_signal(self, valence: float, arousal: float) -> EEGSignal:
         """Generate EEG signal components from valence-arousal."""
-        import time
-
         # Simulate raw band powers based on V-A
         # Frontal alpha asymmetry correlates with valence
         # (more right alpha = positive valence)
@@ -231,8 +256,10 @@ class EEGSimulator:
         Returns:
             List of EEGSignal at regular intervals
         """
-        signals = []
+        import numpy as np
+
         num_samples = int(duration_seconds * sample_rate)
+        rng = self._get_np_rng()
 
         # Generate smooth variation using sine waves
         t = np.linspace(0, duration_seconds, num_samples)
@@ -242,17 +269,60 @@ class EEGSimulator:
         arousal_variation = 0.08 * np.sin(2 * np.pi * 0.03 * t + 0.5)  # 0.03 Hz
 
         # Sample at 1 Hz for output (not full 256 Hz)
-        output_interval = sample_rate
-        for i in range(0, num_samples, output_interval):
-            v = base_valence + valence_variation[i] + random.gauss(0, 0.02)
-            a = base_arousal + arousal_variation[i] + random.gauss(0, 0.02)
-
-            v = max(-1.0, min(1.0, v))
-            a = max(0.0, min(1.0, a))
-
-            signals.append(self._generate_signal(v, a))
-
-        return signals
+        valence_variation = valence_variation[::sample_rate]
+        arousal_variation = arousal_variation[::sample_rate]
+        n = len(valence_variation)
+
+        # All noise in one draw: valence, arousal, alpha, beta, theta, confidence
+        noise = rng.standard_normal((n, 6)) * _TIME_SERIES_NOISE_STD
+        v_noise, a_noise, alpha_noise, beta_noise, theta_noise, confidence_noise = noise.T
+
+        # Clamps and noise are applied in place on fresh arrays (no temporaries)
+        v = valence_variation + base_valence
+        v += v_noise
+        np.clip(v, -1.0, 1.0, out=v)
+        a = arousal_variation + base_arousal
+        a += a_noise
+        np.clip(a, 0.0, 1.0, out=a)
+
+        # Same band-power model as _generate_signal, for all samples at once
+        raw_alpha = self._baseline_alpha * (1.0 + v * 2.0 * 0.2)
+        raw_beta = raw_alpha * (0.5 + a * 0.8)
+        raw_theta = self._baseline_theta * (1.5 - a * 0.5)
+
+        raw_alpha += alpha_noise
+        np.maximum(raw_alpha, 1.0, out=raw_alpha)
+        raw_beta += beta_noise
+        np.maximum(raw_beta, 0.5, out=raw_beta)
+        raw_theta += theta_noise
+        np.maximum(raw_theta, 1.0, out=raw_theta)
+        confidence = confidence_noise + 0.85
+        np.clip(confidence, 0.6, 0.98, out=confidence)
+
+        timestamp = time.time()
+        return [
+            EEGSignal(
+                valence=round(vi, 3),
+                arousal=round(ai, 3),
+                confidence=round(ci, 3),
+                raw_alpha=round(alpha, 2),
+                raw_beta=round(beta, 2),
+                raw_theta=round(theta, 2),
+                timestamp=timestamp,
+                emotion_label=self._get_emotion_label(vi, ai)
+            )
+            for vi, ai, ci, alpha, beta, theta in zip(
+                v.tolist(), a.tolist(), confidence.tolist(),
+                raw_alpha.tolist(), raw_beta.tolist(), raw_theta.tolist()
+            )
+        ]
+
+    def _get_np_rng(self):
+        """NumPy generator for vectorized noise, seeded like the simulator."""
+        if self._np_rng is None:
+            import numpy as np
+            self._np_rng = np.random.default_rng(self._seed)
+        return self._np_rng
 
 
 # Singleton instance
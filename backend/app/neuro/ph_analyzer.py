@@ -4,14 +4,102 @@ Analyzes pH test strip images to extract pH values.
 """
 
 import base64
+import bisect
+import hashlib
+import importlib.util
+import math
+import random
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import Optional
 import io
 
+# Optional image processing dependencies, probed once at import without
+# loading them (importing the app stays free of numpy/PIL/OpenCV); each is
+# imported on first use
+_NUMPY_AVAILABLE = importlib.util.find_spec("numpy") is not None
+_PIL_AVAILABLE = importlib.util.find_spec("PIL") is not None
+_CV2_AVAILABLE = importlib.util.find_spec("cv2") is not None
 
-@dataclass
+# JPEGs at least this large are decoded at 1/4 scale on the OpenCV path
+_REDUCED_DECODE_MIN_BYTES = 256 * 1024
+
+# Largest base64 payload analyze_base64 will decode (~6 MB of image data)
+_MAX_BASE64_CHARS = 8 * 1024 * 1024
+
+# Private RNG for simulated readings: independent of (and not contending
+# with) the global random state other modules seed
+_RNG = random.Random()
+
+# Analyses kept per analyzer, keyed by image digest (UIs re-post the same sample)
+_RESULT_CACHE_SIZE = 64
+
+
+def _clamp_channel(value) -> int:
+    """Clamp a color channel to 0-255 (band tables and int16 math assume it)."""
+    return max(0, min(255, int(value)))
+
+
+def _color_name(r: int, g: int, b: int) -> Optional[str]:
+    """Heuristic color name for an RGB triple, or None if no rule matches."""
+    if r > 200 and g < 100 and b < 100:
+        return "red"
+    elif r > 200 and g > 100 and g < 200 and b < 100:
+        return "orange"
+    elif r > 200 and g > 200 and b < 100:
+        return "yellow"
+    elif r < 150 and g > 150 and b < 100:
+        return "green"
+    elif r < 100 and g > 100 and b > 150:
+        return "blue"
+    elif r > 100 and g < 100 and b > 100:
+        return "purple"
+    return None
+
+
+# Thresholds _color_name compares each of R, G, B against
+_COLOR_CUTS = ((100, 150, 200), (100, 150, 200), (100, 150))
+
+
+def _build_color_lut() -> tuple:
+    """
+    Tabulate _color_name over channel bands.
+
+    Each channel value maps to a band of values that compare the same way
+    against every threshold; _color_name is then evaluated once per band
+    combination.
+
+    Returns:
+        (R/G/B band tables indexed by 0-255 value, G band count, B band count, names)
+    """
+    band_tables = []
+    representatives = []  # One sample value per band, per channel
+    for cuts in _COLOR_CUTS:
+        band_ids: dict[tuple, int] = {}
+        samples = []
+        table = []
+        for value in range(256):
+            signature = tuple((value > cut) - (value < cut) for cut in cuts)
+            if signature not in band_ids:
+                band_ids[signature] = len(band_ids)
+                samples.append(value)
+            table.append(band_ids[signature])
+        band_tables.append(bytes(table))
+        representatives.append(samples)
+
+    reds, greens, blues = representatives
+    names = tuple(_color_name(r, g, b) for r in reds for g in greens for b in blues)
+    return band_tables[0], band_tables[1], band_tables[2], len(greens), len(blues), names
+
+
+_R_BAND, _G_BAND, _B_BAND, _G_BANDS, _B_BANDS, _COLOR_LUT = _build_color_lut()
+
+
+@dataclass(frozen=True, slots=True)
 class PHReadingResult:
-    """Result of pH strip analysis."""
+    """Result of pH strip analysis (immutable, so cached results can be shared)."""
     ph_value: float
     confidence: float
     color_detected: str
@@ -50,36 +138,37 @@ class PHStripAnalyzer:
         12.0: (100, 0, 150),   # Dark purple
     }
 
-    def __init__(self):
-        self._numpy_available = False
-        self._pil_available = False
-        self._cv2_available = False
-        self._check_dependencies()
-
-    def _check_dependencies(self):
-        """Check which image processing libraries are available."""
-        try:
-            import numpy
-            self._numpy_available = True
-        except ImportError:
-            pass
+    # Reference pH values in ascending order (row order of _reference_rgb)
+    _SORTED_PHS = tuple(sorted(PH_COLOR_MAP))
+    # Matching reference colors, indexed like _SORTED_PHS (no dict lookups)
+    _SORTED_RGB = tuple(map(PH_COLOR_MAP.__getitem__, _SORTED_PHS))
+    # pH step to the lower/upper neighbor of each _SORTED_PHS entry (0.0 at the ends)
+    _PH_DELTA_LOWER = (0.0,) + tuple(hi - lo for lo, hi in zip(_SORTED_PHS, _SORTED_PHS[1:]))
+    _PH_DELTA_UPPER = _PH_DELTA_LOWER[1:] + (0.0,)
+
+    @staticmethod
+    @lru_cache(maxsize=1)
+    def _reference_rgb():
+        """PH_COLOR_MAP colors as an (n, 3) int16 array in _SORTED_PHS order, built on first use."""
+        import numpy as np
 
-        try:
-            from PIL import Image
-            self._pil_available = True
-        except ImportError:
-            pass
+        return np.array(PHStripAnalyzer._SORTED_RGB, dtype=np.int16)
 
-        try:
-            import cv2
-            self._cv2_available = True
-        except ImportError:
-            pass
+    def __init__(self):
+        self._numpy_available = _NUMPY_AVAILABLE
+        self._pil_available = _PIL_AVAILABLE
+        self._cv2_available = _CV2_AVAILABLE
+        # LRU of image digest -> result; analyze_image runs on worker threads
+        self._result_cache: OrderedDict[tuple[bytes, str], PHReadingResult] = OrderedDict()
+        self._result_cache_lock = threading.Lock()
 
     def analyze_image(self, image_data: bytes, method: str = "auto") -> PHReadingResult:
         """
         Analyze a pH strip image.
 
+        Results for recently seen images are served from an LRU cache keyed
+        by a hash of the image bytes.
+
         Args:
             image_data: Raw image bytes (JPEG, PNG)
             method: "color", "ocr", or "auto"
@@ -90,22 +179,60 @@ class PHStripAnalyzer:
         if not self._pil_available and not self._cv2_available:
             return self._simulate_reading()
 
-        try:
-            if self._pil_available:
+        key = (hashlib.blake2b(image_data, digest_size=16).digest(), method)
+        with self._result_cache_lock:
+            cached = self._result_cache.get(key)
+            if cached is not None:
+                self._result_cache.move_to_end(key)
+                return cached
+
+        result = self._analyze_uncached(image_data)
+
+        # Only cache real readings: simulated fallbacks are random by design
+        # and failures may be transient
+        if result.method == "color_analysis":
+            with self._result_cache_lock:
+                self._result_cache[key] = result
+                while len(self._result_cache) > _RESULT_CACHE_SIZE:
+                    self._result_cache.popitem(last=False)
+
+        return result
+
+    def _analyze_uncached(self, image_data: bytes) -> PHReadingResult:
+        """Decode and color-match an image with the best available backend."""
+        # OpenCV's libjpeg-turbo decode is the faster backend; PIL is the
+        # fallback, including for images imdecode cannot read (e.g. GIF) or
+        # that make OpenCV raise
+        cv2_error = None
+        if self._cv2_available:
+            try:
+                result = self._analyze_with_cv2(image_data)
+                if result.method != "simulated" or not self._pil_available:
+                    return result
+            except Exception as e:
+                cv2_error = e
+
+        if self._pil_available:
+            try:
                 return self._analyze_with_pil(image_data)
-            elif self._cv2_available:
-                return self._analyze_with_cv2(image_data)
-        except Exception as e:
-            return PHReadingResult(
-                ph_value=5.5,
-                confidence=0.0,
-                color_detected="unknown",
-                method="failed",
-                error=str(e)
-            )
+            except Exception as e:
+                return self._failed_reading(e)
 
+        if cv2_error is not None:
+            return self._failed_reading(cv2_error)
         return self._simulate_reading()
 
+    @staticmethod
+    def _failed_reading(error: Exception) -> PHReadingResult:
+        """Result reported when no backend could analyze the image."""
+        return PHReadingResult(
+            ph_value=5.5,
+            confidence=0.0,
+            color_detected="unknown",
+            method="failed",
+            error=str(error)
+        )
+
     def analyze_base64(self, base64_string: str) -> PHReadingResult:
         """
         Analyze a base64-encoded pH strip image.
@@ -121,6 +248,16 @@ class PHStripAnalyzer:
             if ',' in base64_string:
                 base64_string = base64_string.split(',')[1]
 
+            # Reject oversized payloads before spending time decoding them
+            if len(base64_string) > _MAX_BASE64_CHARS:
+                return PHReadingResult(
+                    ph_value=5.5,
+                    confidence=0.0,
+                    color_detected="unknown",
+                    method="failed",
+                    error="Base64 input too large"
+                )
+
             image_data = base64.b64decode(base64_string)
             return self.analyze_image(image_data)
         except Exception as e:
@@ -134,25 +271,21 @@ class PHStripAnalyzer:
 
     def _analyze_with_pil(self, image_data: bytes) -> PHReadingResult:
         """Analyze using PIL for color extraction."""
-        from PIL import Image
-        import numpy as np
+        from PIL import Image, ImageStat
 
         # Load image
         img = Image.open(io.BytesIO(image_data))
-        img = img.convert('RGB')
-
-        # Resize for faster processing
-        img = img.resize((100, 100))
+        if img.format == 'JPEG':
+            # Let libjpeg downscale during the IDCT (1/2..1/8) while keeping
+            # at least 200px per side - far cheaper than a full decode
+            img.draft('RGB', (200, 200))
 
-        # Get pixel data
-        pixels = np.array(img)
+        # Crop the center region (where pH strip should be) at native
+        # resolution; only those pixels are decoded to RGB and averaged
+        img = img.crop(self._center_box(*img.size)).convert('RGB')
 
-        # Find the center region (where pH strip should be)
-        h, w = pixels.shape[:2]
-        center_region = pixels[h//4:3*h//4, w//4:3*w//4]
-
-        # Calculate dominant color
-        avg_color = np.mean(center_region, axis=(0, 1))
+        # Calculate dominant color from Pillow's C histogram, no numpy copy
+        avg_color = ImageStat.Stat(img).mean
         r, g, b = int(avg_color[0]), int(avg_color[1]), int(avg_color[2])
 
         # Match to pH
@@ -172,26 +305,25 @@ class PHStripAnalyzer:
         import cv2
         import numpy as np
 
-        # Decode image
+        # Decode image; large JPEGs use libjpeg's scaled IDCT (1/4 size)
         nparr = np.frombuffer(image_data, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        flags = cv2.IMREAD_COLOR
+        if image_data[:2] == b'\xff\xd8' and len(image_data) >= _REDUCED_DECODE_MIN_BYTES:
+            flags = cv2.IMREAD_REDUCED_COLOR_4
+        img = cv2.imdecode(nparr, flags)
 
         if img is None:
             return self._simulate_reading()
 
-        # Convert BGR to RGB
-        img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-
-        # Resize
-        img_rgb = cv2.resize(img_rgb, (100, 100))
-
-        # Get center region
-        h, w = img_rgb.shape[:2]
-        center_region = img_rgb[h//4:3*h//4, w//4:3*w//4]
+        # Get center region at native resolution
+        h, w = img.shape[:2]
+        left, top, right, bottom = self._center_box(w, h)
+        center_region = img[top:bottom, left:right]
 
-        # Calculate dominant color
-        avg_color = np.mean(center_region, axis=(0, 1))
-        r, g, b = int(avg_color[0]), int(avg_color[1]), int(avg_color[2])
+        # Calculate dominant color with OpenCV's SIMD channel reduction; the
+        # crop stays BGR and channels are swapped when unpacking the means
+        avg_bgr = cv2.mean(center_region)
+        b, g, r = int(avg_bgr[0]), int(avg_bgr[1]), int(avg_bgr[2])
 
         # Match to pH
         ph_value, confidence = self._match_color_to_ph((r, g, b))
@@ -205,6 +337,12 @@ class PHStripAnalyzer:
             raw_rgb=(r, g, b)
         )
 
+    @staticmethod
+    def _center_box(width: int, height: int) -> tuple:
+        """Middle half of the image as a (left, top, right, bottom) box, at least 1x1."""
+        left, top = width // 4, height // 4
+        return left, top, max(3 * width // 4, left + 1), max(3 * height // 4, top + 1)
+
     def _match_color_to_ph(self, rgb: tuple) -> tuple:
         """
         Match RGB color to pH value using Euclidean distance.
@@ -212,16 +350,18 @@ class PHStripAnalyzer:
         Returns:
             (ph_value, confidence)
         """
-        r, g, b = rgb
-        min_distance = float('inf')
-        best_ph = 7.0
+        import numpy as np
 
-        for ph, ref_rgb in self.PH_COLOR_MAP.items():
-            ref_r, ref_g, ref_b = ref_rgb
-            distance = ((r - ref_r) ** 2 + (g - ref_g) ** 2 + (b - ref_b) ** 2) ** 0.5
-            if distance < min_distance:
-                min_distance = distance
-                best_ph = ph
+        sorted_phs = self._SORTED_PHS
+
+        # All reference distances in one pass; argmin keeps the first of any tie
+        # int16 differences (|d| <= 255); squares need 32 bits, so accumulate in int32
+        diff = self._reference_rgb() - np.array([_clamp_channel(c) for c in rgb], dtype=np.int16)
+        d2 = np.einsum('ij,ij->i', diff, diff, dtype=np.int32)
+        idx = int(d2.argmin())
+        min_d2 = int(d2[idx])
+        min_distance = math.sqrt(min_d2)
+        best_ph = sorted_phs[idx]
 
         # Calculate confidence (inverse of normalized distance)
         # Max distance is ~441 (opposite corners of RGB cube)
@@ -229,51 +369,40 @@ class PHStripAnalyzer:
         confidence = max(0.0, 1.0 - (min_distance / max_distance))
 
         # Interpolate between closest pH values for more precision
-        sorted_phs = sorted(self.PH_COLOR_MAP.keys())
-        idx = sorted_phs.index(best_ph)
-
         if idx > 0 and idx < len(sorted_phs) - 1:
-            # Check neighbors for interpolation
-            lower_ph = sorted_phs[idx - 1]
-            upper_ph = sorted_phs[idx + 1]
-
-            lower_dist = self._color_distance(rgb, self.PH_COLOR_MAP[lower_ph])
-            upper_dist = self._color_distance(rgb, self.PH_COLOR_MAP[upper_ph])
+            # Neighbor distances come from the same distance pass; compare
+            # squared integers (d < 1.5 * m  <=>  4 * d2 < 9 * m2)
+            lower_d2 = int(d2[idx - 1])
+            upper_d2 = int(d2[idx + 1])
 
-            if lower_dist < upper_dist and lower_dist < min_distance * 1.5:
+            if lower_d2 < upper_d2 and 4 * lower_d2 < 9 * min_d2:
                 # Interpolate toward lower
-                ratio = min_distance / (min_distance + lower_dist)
-                best_ph = best_ph - (best_ph - lower_ph) * (1 - ratio) * 0.5
-            elif upper_dist < min_distance * 1.5:
+                ratio = min_distance / (min_distance + math.sqrt(lower_d2))
+                best_ph = best_ph - self._PH_DELTA_LOWER[idx] * (1 - ratio) * 0.5
+            elif 4 * upper_d2 < 9 * min_d2:
                 # Interpolate toward upper
-                ratio = min_distance / (min_distance + upper_dist)
-                best_ph = best_ph + (upper_ph - best_ph) * (1 - ratio) * 0.5
+                ratio = min_distance / (min_distance + math.sqrt(upper_d2))
+                best_ph = best_ph + self._PH_DELTA_UPPER[idx] * (1 - ratio) * 0.5
 
         return round(best_ph, 1), round(confidence, 2)
 
     def _color_distance(self, rgb1: tuple, rgb2: tuple) -> float:
         """Calculate Euclidean distance between two RGB colors."""
+        return math.sqrt(self._color_distance_sq(rgb1, rgb2))
+
+    @staticmethod
+    def _color_distance_sq(rgb1: tuple, rgb2: tuple) -> int:
+        """Squared Euclidean distance between two RGB colors (no sqrt; same ordering)."""
         return ((rgb1[0] - rgb2[0]) ** 2 +
                 (rgb1[1] - rgb2[1]) ** 2 +
-                (rgb1[2] - rgb2[2]) ** 2) ** 0.5
+                (rgb1[2] - rgb2[2]) ** 2)
 
     def _describe_color(self, r: int, g: int, b: int) -> str:
-        """Generate human-readable color description."""
-        # Simple heuristic color naming
-        if r > 200 and g < 100 and b < 100:
-            return "red"
-        elif r > 200 and g > 100 and g < 200 and b < 100:
-            return "orange"
-        elif r > 200 and g > 200 and b < 100:
-            return "yellow"
-        elif r < 150 and g > 150 and b < 100:
-            return "green"
-        elif r < 100 and g > 100 and b > 150:
-            return "blue"
-        elif r > 100 and g < 100 and b > 100:
-            return "purple"
-        else:
-            return f"rgb({r},{g},{b})"
+        """Generate human-readable color description (channels clamped to 0-255)."""
+        r, g, b = _clamp_channel(r), _clamp_channel(g), _clamp_channel(b)
+        # Table lookup instead of the _color_name if-ladder
+        name = _COLOR_LUT[(_R_BAND[r] * _G_BANDS + _G_BAND[g]) * _B_BANDS + _B_BAND[b]]
+        return name or f"rgb({r},{g},{b})"
 
     def _simulate_reading(self, target_ph: float = 5.5) -> PHReadingResult:
         """
@@ -285,20 +414,23 @@ class PHStripAnalyzer:
         Returns:
             Simulated PHReadingResult
         """
-        import random
-
         # Add slight variation
-        ph_value = target_ph + random.gauss(0, 0.2)
+        ph_value = target_ph + _RNG.gauss(0, 0.2)
         ph_value = max(3.0, min(9.0, ph_value))
         ph_value = round(ph_value, 1)
 
-        # Simulate color based on pH
-        closest_ph = min(self.PH_COLOR_MAP.keys(), key=lambda x: abs(x - ph_value))
-        rgb = self.PH_COLOR_MAP[closest_ph]
+        # Simulate color based on pH: nearest reference, lower one on a tie
+        sorted_phs = self._SORTED_PHS
+        i = bisect.bisect_left(sorted_phs, ph_value)
+        if i == len(sorted_phs):
+            i -= 1
+        elif i > 0 and ph_value - sorted_phs[i - 1] <= sorted_phs[i] - ph_value:
+            i -= 1
+        rgb = self._SORTED_RGB[i]
 
         return PHReadingResult(
             ph_value=ph_value,
-            confidence=0.85 + random.gauss(0, 0.05),
+            confidence=0.85 + _RNG.gauss(0, 0.05),
             color_detected=self._describe_color(*rgb),
             method="simulated",
             raw_rgb=rgb
@@ -319,14 +451,12 @@ class PHStripAnalyzer:
         Returns:
             Simulated PHReadingResult
         """
-        import random
-
         if skin_type.lower() == "dry":
-            base_ph = random.uniform(5.0, 5.5)
+            base_ph = _RNG.uniform(5.0, 5.5)
         elif skin_type.lower() == "oily":
-            base_ph = random.uniform(5.5, 6.5)
+            base_ph = _RNG.uniform(5.5, 6.5)
         else:  # Normal
-            base_ph = random.uniform(5.2, 5.8)
+            base_ph = _RNG.uniform(5.2, 5.8)
 
         return self._simulate_reading(base_ph)
 
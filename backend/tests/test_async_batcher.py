@@ -0,0 +1,133 @@
+"""AsyncBatcher result routing, error propagation and cancellation."""
+
+import asyncio
+
+import pytest
+
+from app.core.async_batcher import AsyncBatcher
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+def test_results_return_to_their_submitters():
+    batches = []
+
+    async def double(items):
+        batches.append(list(items))
+        await asyncio.sleep(0)
+        return [item * 2 for item in items]
+
+    async def main():
+        batcher = AsyncBatcher(double, max_batch=4, max_wait_ms=20.0)
+        return await asyncio.gather(*[batcher.submit(i) for i in range(10)])
+
+    assert _run(main()) == [i * 2 for i in range(10)]
+    assert all(len(batch) <= 4 for batch in batches)
+    assert sorted(item for batch in batches for item in batch) == list(range(10))
+
+
+def test_idle_submission_is_not_delayed():
+    async def echo(items):
+        return items
+
+    async def main():
+        batcher = AsyncBatcher(echo, max_wait_ms=5000.0)
+        return await asyncio.wait_for(batcher.submit("x"), timeout=1.0)
+
+    assert _run(main()) == "x"
+
+
+def test_batch_exception_reaches_every_submitter():
+    async def broken(items):
+        raise ValueError("batch failed")
+
+    async def main():
+        batcher = AsyncBatcher(broken, max_wait_ms=5.0)
+        return await asyncio.gather(*[batcher.submit(i) for i in range(3)], return_exceptions=True)
+
+    results = _run(main())
+    assert all(isinstance(r, ValueError) and str(r) == "batch failed" for r in results)
+
+
+def test_exception_result_is_raised_to_its_submitter_only():
+    async def partial(items):
+        return [KeyError(item) if item == 1 else item for item in items]
+
+    async def main():
+        batcher = AsyncBatcher(partial, max_wait_ms=5.0)
+        return await asyncio.gather(*[batcher.submit(i) for i in range(3)], return_exceptions=True)
+
+    first, second, third = _run(main())
+    assert (first, third) == (0, 2)
+    assert isinstance(second, KeyError)
+
+
+def test_dispatch_is_cancelled_once_all_waiters_give_up():
+    state = {}
+
+    async def slow(items):
+        key = items[0]
+        state[key] = "started"
+        try:
+            await asyncio.sleep(1.0)
+        except asyncio.CancelledError:
+            state[key] = "cancelled"
+            raise
+        state[key] = "finished"
+        return items
+
+    async def submit(batcher, item, timeout):
+        try:
+            return await asyncio.wait_for(batcher.submit(item), timeout)
+        except asyncio.TimeoutError:
+            return "timeout"
+
+    async def main():
+        batcher = AsyncBatcher(slow, max_wait_ms=10.0, key_fn=lambda item: item)
+        results = await asyncio.gather(
+            submit(batcher, "abandoned", 0.1),
+            submit(batcher, "abandoned", 0.1),
+            submit(batcher, "shared", 0.1),
+            submit(batcher, "shared", 5.0),
+        )
+        await asyncio.sleep(0)
+        return results, len(batcher._inflight)
+
+    results, inflight = _run(main())
+    assert results == ["timeout", "timeout", "timeout", "shared"]
+    # All waiters on "abandoned" timed out; one waiter on "shared" remained
+    assert state == {"abandoned": "cancelled", "shared": "finished"}
+    assert inflight == 0
+
+
+def test_key_fn_splits_batches():
+    batches = []
+
+    async def record(items):
+        batches.append(list(items))
+        return items
+
+    async def main():
+        batcher = AsyncBatcher(record, max_wait_ms=20.0, key_fn=lambda item: item % 2)
+        return await asyncio.gather(*[batcher.submit(i) for i in range(6)])
+
+    assert _run(main()) == list(range(6))
+    assert all(len({item % 2 for item in batch}) == 1 for batch in batches)
+
+
+@pytest.mark.parametrize("max_batch", [1, 3])
+def test_batches_never_exceed_max_batch(max_batch):
+    sizes = []
+
+    async def record(items):
+        sizes.append(len(items))
+        return items
+
+    async def main():
+        batcher = AsyncBatcher(record, max_batch=max_batch, max_wait_ms=20.0)
+        return await asyncio.gather(*[batcher.submit(i) for i in range(7)])
+
+    assert _run(main()) == list(range(7))
+    assert max(sizes) <= max_batch
@@ -0,0 +1,53 @@
+"""Text scoring through KeywordMatcher must match the original per-table scans."""
+
+import random
+
+import pytest
+
+from app.neuro.eeg_simulator import (
+    HIGH_AROUSAL_KEYWORDS,
+    LOW_AROUSAL_KEYWORDS,
+    NEGATIVE_KEYWORDS,
+    POSITIVE_KEYWORDS,
+    EEGSimulator,
+)
+
+TEXTS = [
+    "",
+    "A happy, joyful spring morning",
+    "intense dark smoky night",  # "intense" scores on both axes
+    "calm peaceful serene evening",  # low arousal and positive valence
+    "sunshine and summer rain by the ocean",  # "sun" inside longer words
+    "an electric party to dance all night",
+    "COLD, LONELY and heavy",
+]
+
+
+def _baseline_valence_arousal(text: str, rng: random.Random) -> tuple[float, float]:
+    text_lower = text.lower()
+    valence_score = 0.0
+    arousal_score = 0.5
+    for table in (POSITIVE_KEYWORDS, NEGATIVE_KEYWORDS):
+        for word, score in table.items():
+            if word in text_lower:
+                valence_score += score
+    for table in (HIGH_AROUSAL_KEYWORDS, LOW_AROUSAL_KEYWORDS):
+        for word, score in table.items():
+            if word in text_lower:
+                arousal_score += score
+
+    valence = max(-1.0, min(1.0, valence_score)) + rng.gauss(0, 0.05)
+    arousal = max(0.0, min(1.0, arousal_score)) + rng.gauss(0, 0.03)
+    return max(-1.0, min(1.0, valence)), max(0.0, min(1.0, arousal))
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_simulate_from_text_matches_linear_scan(text):
+    random.seed(1234)
+    signal = EEGSimulator().simulate_from_text(text)
+
+    # Same draws from the global RNG, in the same order
+    reference = random.Random()
+    reference.seed(1234)
+    valence, arousal = _baseline_valence_arousal(text, reference)
+    assert (signal.valence, signal.arousal) == (round(valence, 3), round(arousal, 3))
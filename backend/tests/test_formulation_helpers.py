@@ -0,0 +1,118 @@
+"""Formulation route helpers must match the original per-call scans and sums."""
+
+import random
+
+import pytest
+
+from app.api.routes import formulation
+from app.api.routes.formulation import (
+    Ingredient,
+    _compute_formula_metrics,
+    _extract_preferences,
+    _find_smiles_for_ingredient,
+    _generate_formula_name,
+)
+from app.chemistry.ingredient_db import ingredient_db
+
+PROMPTS = [
+    "",
+    "A fresh morning walk in the rain",
+    "woody forest at night",
+    "sandalwood",  # contains "wood" and "sandalwood"
+    "SWEET VANILLA and warm cinnamon",
+    "seaside garden of flowers",  # "sea" and "flower" inside longer words
+    "earthy moss after petrichor",
+    "nothing relevant",
+]
+
+
+def _baseline_preferences(prompt: str) -> list[str]:
+    prompt_lower = prompt.lower()
+    return [
+        category for category, words in formulation._PREFERENCE_KEYWORDS.items()
+        if any(word in prompt_lower for word in words)
+    ]
+
+
+def _baseline_name(prompt: str) -> str:
+    prompt_lower = prompt.lower()
+    for words, name in formulation._FORMULA_NAME_RULES:
+        if any(word in prompt_lower for word in words):
+            return name
+    return "Serene Bliss"
+
+
+@pytest.mark.parametrize("prompt", PROMPTS)
+def test_extract_preferences_matches_linear_scan(prompt):
+    assert _extract_preferences(prompt) == _baseline_preferences(prompt)
+
+
+@pytest.mark.parametrize("prompt", PROMPTS)
+def test_formula_name_matches_linear_scan(prompt):
+    assert _generate_formula_name(0.5, 0.2, prompt) == _baseline_name(prompt)
+
+
+def test_find_smiles_matches_linear_scan():
+    names = [ing.name for ing in ingredient_db.get_all()]
+    queries = names + [name.upper() for name in names] + ["rose", "oil", "wood", "vanillin extra pure", "unknown"]
+    for query in queries:
+        query_lower = query.lower()
+        expected = next(
+            (ing.smiles for ing in ingredient_db.get_all()
+             if ing.name.lower() in query_lower or query_lower in ing.name.lower()),
+            None
+        )
+        exact = next((ing.smiles for ing in ingredient_db.get_all() if ing.name.lower() == query_lower), None)
+        # An exact name resolves to its own entry (see the name index)
+        assert _find_smiles_for_ingredient(query) == (exact or expected), query
+
+
+def _baseline_metrics(ingredients: list[Ingredient]) -> tuple[dict, float, float]:
+    top_total = sum(i.concentration for i in ingredients if i.note_type == "top")
+    mid_total = sum(i.concentration for i in ingredients if i.note_type in ["middle", "heart"])
+    base_total = sum(i.concentration for i in ingredients if i.note_type == "base")
+    total = top_total + mid_total + base_total or 1
+    pyramid = {
+        "top": round(100 * top_total / total, 1),
+        "middle": round(100 * mid_total / total, 1),
+        "base": round(100 * base_total / total, 1)
+    }
+    if not ingredients:
+        return pyramid, 5.0, 5.0
+
+    total_conc = sum(i.concentration for i in ingredients)
+    avg_logp = sum(i.logp * i.concentration for i in ingredients) / total_conc
+    base_bonus = base_total / total_conc * 3.0
+    longevity = min(10.0, max(1.0, 5.0 + (avg_logp - 2.5) * 1.5 + base_bonus))
+    top_bonus = top_total / total_conc * 4.0
+    projection = min(10.0, max(1.0, 4.0 + top_bonus + min(2.0, total_conc / 20.0)))
+    return pyramid, longevity, projection
+
+
+def _random_ingredients(rng: random.Random, count: int) -> list[Ingredient]:
+    return [
+        Ingredient(
+            name=f"ingredient {i}",
+            smiles="C",
+            concentration=rng.uniform(0.01, 5.0),
+            note_type=rng.choice(["top", "middle", "heart", "base", "unknown"]),
+            logp=rng.uniform(-1.0, 6.0),
+            is_sustainable=True,
+            source="test"
+        )
+        for i in range(count)
+    ]
+
+
+@pytest.mark.parametrize("count", [0, 1, 12, 63, 64, 65, 200])
+def test_formula_metrics_match_original_sums(count):
+    pytest.importorskip("numpy")
+    ingredients = _random_ingredients(random.Random(count), count)
+
+    pyramid, longevity, projection = _compute_formula_metrics(ingredients)
+    expected_pyramid, expected_longevity, expected_projection = _baseline_metrics(ingredients)
+
+    # Summation order differs on the vectorized path; rounding to 0.1 absorbs it
+    assert pyramid == pytest.approx(expected_pyramid, abs=0.1)
+    assert longevity == pytest.approx(expected_longevity)
+    assert projection == pytest.approx(expected_projection)
@@ -0,0 +1,113 @@
+"""IFRA checks over the prebuilt indexes must match the original per-call linear scans."""
+
+from dataclasses import asdict
+
+import pytest
+
+from app.chemistry.ifra_validator import IFRAValidator
+
+
+def _baseline_checks(standards: dict, ingredients: list[dict]) -> tuple[list[tuple], list[dict], float]:
+    """Violations, declared allergens and allergen load as the original scan computed them."""
+    restricted_map = {s['name'].lower(): s for s in standards.get('restricted_substances', [])}
+    allergen_map = {a['name'].lower(): a for a in standards.get('allergens_declaration_required', [])}
+    phototox_map = {p['name'].lower(): p for p in standards.get('phototoxicity_limits', [])}
+
+    violations = []
+    allergens = []
+    load = 0.0
+    for ing in ingredients:
+        name = ing.get('name', '')
+        name_lower = name.lower()
+        concentration = ing.get('concentration', 0)
+
+        if name_lower in restricted_map:
+            max_conc = restricted_map[name_lower].get('max_concentration_cat1', 0)
+            if max_conc == 0:
+                violations.append((name, "banned", concentration, 0))
+            elif concentration > max_conc:
+                violations.append((name, "over_limit", concentration, max_conc))
+
+        for phototox_name, phototox in phototox_map.items():
+            if phototox_name in name_lower or name_lower in phototox_name:
+                max_conc = phototox.get('max_concentration_cat1', 100)
+                if concentration > max_conc:
+                    violations.append((name, "phototoxicity", concentration, max_conc))
+
+        for allergen_name, allergen in allergen_map.items():
+            if allergen_name in name_lower or name_lower in allergen_name:
+                threshold = allergen.get('threshold_cat1', 0.001)
+                if threshold == 0:
+                    violations.append((name, "banned", concentration, 0))
+                elif concentration >= threshold:
+                    allergens.append({
+                        "name": name,
+                        "cas": allergen.get('cas'),
+                        "concentration": concentration,
+                        "threshold": threshold
+                    })
+                    load += concentration
+    return violations, allergens, load
+
+
+@pytest.fixture(scope="module")
+def validator():
+    return IFRAValidator()
+
+
+def _sample_names(standards: dict) -> list[str]:
+    names = [
+        entry['name']
+        for key in ('restricted_substances', 'allergens_declaration_required', 'phototoxicity_limits')
+        for entry in standards.get(key, [])
+    ]
+    # Partial names, superstrings and case variants exercise both containment directions
+    names += [name.upper() for name in names[:5]]
+    names += ["cinnamal", "eugenol", "lime", "benzyl", "oil", "Rose Absolute", "Natural Linalool Extract", ""]
+    return names
+
+
+@pytest.mark.parametrize("concentration", [0.0, 0.0005, 0.01, 0.5, 5.0, 50.0])
+def test_validate_formula_matches_linear_scan(validator, concentration):
+    ingredients = [{"name": name, "concentration": concentration} for name in _sample_names(validator._standards)]
+
+    report = validator.validate_formula(ingredients)
+    violations, allergens, load = _baseline_checks(validator._standards, ingredients)
+
+    per_ingredient = [v for v in report.violations if v.violation_type != "allergen_load"]
+    assert [
+        (v.ingredient_name, v.violation_type, v.current_concentration, v.max_allowed) for v in per_ingredient
+    ] == violations
+    assert report.allergens_to_declare == allergens
+    assert report.total_allergen_load == pytest.approx(load)
+    critical = [v for v in report.violations if v.severity == "critical"]
+    assert report.is_compliant == (not critical)
+
+
+def test_validate_formula_is_repeatable(validator):
+    ingredients = [{"name": "Linalool", "concentration": 2.0}, {"name": "Lime Oil expressed", "concentration": 3.0}]
+    assert asdict(validator.validate_formula(ingredients)) == asdict(validator.validate_formula(ingredients))
+
+
+def test_lookups_match_linear_scan(validator):
+    standards = validator._standards
+    for name in _sample_names(standards):
+        name_lower = name.lower()
+
+        expected_max = None
+        for restricted in standards.get('restricted_substances', []):
+            if restricted['name'].lower() == name_lower:
+                expected_max = restricted.get('max_concentration_cat1', None)
+                break
+        else:
+            for phototox in standards.get('phototoxicity_limits', []):
+                if phototox['name'].lower() in name_lower:
+                    expected_max = phototox.get('max_concentration_cat1', None)
+                    break
+        assert validator.get_max_concentration(name) == expected_max, name
+
+        expected_allergen = any(
+            a['name'].lower() in name_lower or name_lower in a['name'].lower()
+            for a in standards.get('allergens_declaration_required', [])
+        )
+        assert validator.is_allergen(name) == expected_allergen, name
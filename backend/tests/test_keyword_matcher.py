@@ -0,0 +1,62 @@
+"""KeywordMatcher must agree with the linear substring scans it replaced."""
+
+import random
+
+import pytest
+
+from app.core.keyword_matcher import KeywordMatcher
+
+KEYWORDS = ["rose", "rosewood", "wood", "woody", "oo", "o", "sandalwood", "lime", "li", "a.b"]
+
+TEXTS = [
+    "",
+    "rosewood and sandalwood",
+    "woody",
+    "sublime",
+    "ooo",
+    "a.b",
+    "axb",
+    "ROSE",
+    "no match here",
+]
+
+
+@pytest.fixture
+def matcher():
+    return KeywordMatcher(KEYWORDS)
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_contained_in_matches_linear_scan(matcher, text):
+    assert matcher.contained_in(text) == [k for k in KEYWORDS if k in text]
+
+
+@pytest.mark.parametrize("text", TEXTS + ["wood", "ood", "o", "rose"])
+def test_containing_matches_linear_scan(matcher, text):
+    assert matcher.containing(text) == [k for k in KEYWORDS if text in k]
+
+
+@pytest.mark.parametrize("text", TEXTS + ["wood", "ood", "rose"])
+def test_matches_is_either_direction(matcher, text):
+    assert matcher.matches(text) == [k for k in KEYWORDS if k in text or text in k]
+
+
+def test_overlapping_and_prefix_keywords_all_reported():
+    matcher = KeywordMatcher(["abc", "ab", "bcd", "b", "cd"])
+    assert matcher.contained_in("abcd") == ["abc", "ab", "bcd", "b", "cd"]
+
+
+def test_duplicates_and_empty_set():
+    assert KeywordMatcher(["a", "a"]).contained_in("a") == ["a"]
+    assert KeywordMatcher([]).contained_in("anything") == []
+    assert KeywordMatcher([]).containing("anything") == []
+
+
+def test_random_texts_match_linear_scan():
+    rng = random.Random(0)
+    keywords = list(dict.fromkeys("".join(rng.choices("ab", k=rng.randint(1, 4))) for _ in range(12)))
+    matcher = KeywordMatcher(keywords)
+    for _ in range(500):
+        text = "".join(rng.choices("abc", k=rng.randint(0, 10)))
+        assert matcher.contained_in(text) == [k for k in keywords if k in text]
+        assert matcher.containing(text) == [k for k in keywords if text in k]
@@ -0,0 +1,54 @@
+"""Tests for pH strip color matching."""
+
+import pytest
+
+from app.neuro.ph_analyzer import PHStripAnalyzer
+
+
+@pytest.fixture
+def analyzer():
+    return PHStripAnalyzer()
+
+
+@pytest.mark.parametrize("rgb, clamped", [
+    ((300, -5, 20), (255, 0, 20)),
+    ((-1, -1, -1), (0, 0, 0)),
+    ((256, 256, 256), (255, 255, 255)),
+])
+def test_describe_color_clamps_out_of_range(analyzer, rgb, clamped):
+    assert analyzer._describe_color(*rgb) == analyzer._describe_color(*clamped)
+
+
+@pytest.mark.parametrize("rgb, clamped", [
+    ((300, -5, 20), (255, 0, 20)),
+    ((-40, 1000, 128), (0, 255, 128)),
+])
+def test_match_color_clamps_out_of_range(analyzer, rgb, clamped):
+    pytest.importorskip("numpy")
+    assert analyzer._match_color_to_ph(rgb) == analyzer._match_color_to_ph(clamped)
+
+
+def test_cv2_error_falls_back_to_pil(analyzer, monkeypatch):
+    def broken_cv2(image_data):
+        raise RuntimeError("imdecode failed")
+
+    pil_result = analyzer._simulate_reading()
+    monkeypatch.setattr(analyzer, "_cv2_available", True)
+    monkeypatch.setattr(analyzer, "_pil_available", True)
+    monkeypatch.setattr(analyzer, "_analyze_with_cv2", broken_cv2)
+    monkeypatch.setattr(analyzer, "_analyze_with_pil", lambda image_data: pil_result)
+
+    assert analyzer._analyze_uncached(b"not really a jpeg") is pil_result
+
+
+def test_cv2_error_without_pil_reports_failure(analyzer, monkeypatch):
+    def broken_cv2(image_data):
+        raise RuntimeError("imdecode failed")
+
+    monkeypatch.setattr(analyzer, "_cv2_available", True)
+    monkeypatch.setattr(analyzer, "_pil_available", False)
+    monkeypatch.setattr(analyzer, "_analyze_with_cv2", broken_cv2)
+
+    result = analyzer._analyze_uncached(b"not really a jpeg")
+    assert result.method == "failed"
+    assert result.error == "imdecode failed"
@@ -0,0 +1,73 @@
+"""Condition matching over the rule index must match the original per-rule scan."""
+
+import itertools
+
+import pytest
+
+from app.core.physio_rag import PhysioRAG
+
+pytest.importorskip("numpy")
+
+
+def _baseline_applicable(rules, user_profile: dict) -> list:
+    applicable = []
+    for rule in rules:
+        condition = rule.condition
+        param = condition.get('parameter', '')
+        operator = condition.get('operator', '')
+        value = condition.get('value')
+
+        if param not in user_profile or value is None:
+            continue
+
+        user_value = user_profile[param]
+        if operator == '<' and isinstance(user_value, (int, float)) and isinstance(value, (int, float)):
+            if user_value < value:
+                applicable.append(rule)
+        elif operator == '>' and isinstance(user_value, (int, float)) and isinstance(value, (int, float)):
+            if user_value > value:
+                applicable.append(rule)
+        elif operator == '==' and user_value == value:
+            applicable.append(rule)
+        elif operator == 'contains' and isinstance(user_value, list) and value in user_value:
+            applicable.append(rule)
+    return applicable
+
+
+def _profiles():
+    phs = [None, 3.9, 4.5, 5.5, 6.0, 7, "5.0"]
+    skin_types = [None, "Dry", "Oily", "dry", "Normal"]
+    temperatures = [None, 35.0, 36.0, 36.8, 37.2, 38]
+    allergies = [None, [], ["citral"], ["linalool", "citral"], "citral"]
+    for ph, skin, temp, allergy in itertools.product(phs, skin_types, temperatures, allergies):
+        profile = {"ph": ph, "skin_type": skin, "temperature": temp, "allergies": allergy}
+        yield {key: value for key, value in profile.items() if value is not None}
+
+
+@pytest.fixture(scope="module")
+def rag():
+    engine = PhysioRAG()
+    # Bundled physio_rules.json, keyword matching only (no embedding model)
+    engine._load_rules()
+    engine._initialized = True
+    assert engine._rules
+    return engine
+
+
+def test_applicable_rules_match_linear_scan(rag):
+    for profile in _profiles():
+        assert rag.get_applicable_rules(profile) == _baseline_applicable(rag._rules, profile), profile
+
+
+def test_keyword_query_keeps_rule_order(rag):
+    for profile in _profiles():
+        expected = _baseline_applicable(rag._rules, profile)[:5]
+        retrieved = rag._keyword_query(profile, n_results=5)
+        assert [r.rule for r in retrieved] == expected, profile
+        assert all(r.relevance_score == 0.9 for r in retrieved)
+
+
+def test_rules_by_id_returns_first_rule(rag):
+    for rule in rag._rules:
+        assert rag._get_rule_by_id(rule.id) is next(r for r in rag._rules if r.id == rule.id)
+    assert rag._get_rule_by_id("no-such-rule") is None
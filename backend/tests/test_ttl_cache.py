@@ -0,0 +1,63 @@
+"""TTLCache expiry and LRU eviction."""
+
+import pytest
+
+from app.core import ttl_cache
+from app.core.ttl_cache import TTLCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ttl_cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_entry_expires_after_ttl(clock):
+    cache = TTLCache(maxsize=4, ttl=10.0)
+    cache.set("a", 1)
+
+    clock[0] += 9.9
+    assert cache.get("a") == 1
+
+    clock[0] += 0.1
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_set_refreshes_expiry(clock):
+    cache = TTLCache(maxsize=4, ttl=10.0)
+    cache.set("a", 1)
+    clock[0] += 8.0
+    cache.set("a", 2)
+    clock[0] += 8.0
+    assert cache.get("a") == 2
+
+
+def test_get_does_not_extend_ttl(clock):
+    cache = TTLCache(maxsize=4, ttl=10.0)
+    cache.set("a", 1)
+    clock[0] += 6.0
+    assert cache.get("a") == 1
+    clock[0] += 6.0
+    assert cache.get("a") is None
+
+
+def test_least_recently_used_is_evicted(clock):
+    cache = TTLCache(maxsize=2, ttl=10.0)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "b" is now the oldest
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_clear_and_missing_keys(clock):
+    cache = TTLCache()
+    assert cache.get("missing") is None
+    cache.set("a", 1)
+    cache.clear()
+    assert len(cache) == 0